@@ -0,0 +1,194 @@
+"""End-to-end sync benchmark against stub upstreams and a throwaway SQLite DB.
+
+    python bench/run.py                 # run every scenario and print metrics
+    python bench/run.py --check         # also compare against bench/baselines.json
+    python bench/run.py --update        # rewrite the baselines from this run
+
+Each scenario runs in its own interpreter so peak RSS is per scenario.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from rich.console import Console
+from rich.table import Table
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from stubs import Catalog, StubUpstreams
+
+BASELINES = Path(__file__).with_name("baselines.json")
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    # Bulk CarQuery queries per make (the default path).
+    "bulk": {"catalog": {}, "latency": 0.002, "error_rate": 0.0, "bulk_fetch": True, "runs": 1},
+    # Per-model probing, as with BULK_FETCH=0.
+    "probe": {"catalog": {}, "latency": 0.002, "error_rate": 0.0, "bulk_fetch": False, "runs": 1},
+    # A second run over unchanged data; metrics are for that run only.
+    "incremental": {"catalog": {}, "latency": 0.002, "error_rate": 0.0, "bulk_fetch": True, "runs": 2},
+    # 2% of requests get a 503; wall time is dominated by retry backoff.
+    "flaky": {"catalog": {"makes": 5}, "latency": 0.002, "error_rate": 0.02, "bulk_fetch": True, "runs": 1},
+}
+
+# Allowed relative change before --check fails. Counts are deterministic (the
+# stub's failures are keyed by URL and attempt); timings and memory depend on
+# the machine, so they get more slack.
+TOLERANCES = {
+    "statements_per_trim": 0.05,
+    "requests": 0.05,
+    "requests_per_sec": 0.5,
+    "trims_per_sec": 0.5,
+    "wall_seconds": 0.5,
+    "peak_rss_mb": 0.3,
+}
+# Reported and stored, but not checked: a few microseconds of CPU per trim
+# swing by more than 50% between runs of the same tree.
+INFORMATIONAL = ("parse_us_per_trim",)
+HIGHER_IS_BETTER = {"requests_per_sec", "trims_per_sec"}
+
+# Effectively unlimited: the benchmark measures the pipeline, not the politeness limits.
+RATE_LIMITS = {host: (10_000.0, 10_000.0) for host in ("www.carqueryapi.com", "vpic.nhtsa.dot.gov", "www.fueleconomy.gov")}
+
+
+def _timed(function, totals: Dict[str, float]):
+    def timed(*args, **kwargs):
+        started = time.thread_time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            totals["cpu"] += time.thread_time() - started
+
+    return timed
+
+
+def run_scenario(name: str) -> Dict[str, float]:
+    from etl import dq, pipeline
+    from etl.sources import carquery
+    from etl.config import Settings
+    from etl.db import get_engine, metadata
+
+    spec = SCENARIOS[name]
+    catalog = Catalog(**spec["catalog"])
+    pipeline.console.quiet = True
+    dq.console.quiet = True
+
+    statements = 0
+
+    def count_statement(*_args) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(Engine, "before_cursor_execute", count_statement)
+
+    # CPU spent turning CarQuery response text into validated trims.
+    parse = {"cpu": 0.0}
+    carquery.decode = _timed(carquery.decode, parse)
+    carquery.parse_trims = _timed(carquery.parse_trims, parse)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        database_url = f"sqlite:///{tmp_path / 'bench.sqlite3'}"
+        metadata.create_all(get_engine(database_url))
+        settings = Settings(
+            database_url=database_url,
+            start_year=catalog.start_year,
+            end_year=catalog.end_year,
+            cache_dir=str(tmp_path / "cache"),
+            reports_dir=str(tmp_path / "reports"),
+            dq_report_path=str(tmp_path / "reports" / "dq.csv"),
+            use_cache=False,
+            bulk_fetch=spec["bulk_fetch"],
+            alias_memory_path=str(tmp_path / "aliases.json"),
+            journal_path=str(tmp_path / "journal.jsonl"),
+        )
+        for _ in range(spec["runs"]):
+            stub = StubUpstreams(catalog, latency=spec["latency"], error_rate=spec["error_rate"])
+            statements = 0
+            parse["cpu"] = 0.0
+            started = time.perf_counter()
+            asyncio.run(pipeline.sync(settings, transport=stub, rate_limits=RATE_LIMITS))
+            wall = time.perf_counter() - started
+
+    requests = sum(stub.requests.values())
+    trims = catalog.trim_count()
+    return {
+        "wall_seconds": round(wall, 3),
+        "requests": requests,
+        "requests_per_sec": round(requests / wall, 1),
+        "trims_per_sec": round(trims / wall, 1),
+        "statements_per_trim": round(statements / trims, 4),
+        "parse_us_per_trim": round(parse["cpu"] / trims * 1e6, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baselines: Dict[str, Dict[str, float]]) -> list[str]:
+    failures = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            baseline = baselines.get(name, {}).get(metric)
+            if metric not in TOLERANCES or not baseline:
+                continue
+            change = (value - baseline) / baseline
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > TOLERANCES[metric]:
+                failures.append(f"{name}.{metric}: {value} vs baseline {baseline} ({change:+.0%} worse)")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--check", action="store_true", help="Fail if a metric regressed past its tolerance")
+    parser.add_argument("--update", action="store_true", help="Store this run's metrics as the baselines")
+    parser.add_argument("--one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_scenario(args.one)))
+        return 0
+
+    console = Console()
+    results: Dict[str, Dict[str, float]] = {}
+    for name in args.scenarios or list(SCENARIOS):
+        console.log(f"Running scenario {name}")
+        output = subprocess.run(
+            [sys.executable, __file__, "--one", name], check=True, capture_output=True, text=True
+        ).stdout
+        results[name] = json.loads(output.strip().splitlines()[-1])
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    columns = [*TOLERANCES, *INFORMATIONAL]
+    table = Table("scenario", *columns)
+    for name, metrics in results.items():
+        table.add_row(
+            name,
+            *(f"{metrics[metric]}" + (f" ({baselines[name][metric]})" if metric in baselines.get(name, {}) else "") for metric in columns),
+        )
+    console.print(table)
+    console.print("Values in parentheses are the stored baselines.")
+
+    if args.update:
+        BASELINES.write_text(json.dumps({**baselines, **results}, indent=2, sort_keys=True) + "\n")
+        console.log(f"Updated {BASELINES}")
+    if args.check:
+        failures = compare(results, baselines)
+        for failure in failures:
+            console.print(f"[red]Regression: {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""In-process stand-ins for the CarQuery, vPIC and DOE upstreams.
+
+StubUpstreams is an httpx transport, so the real HTTPClient (cache, retries,
+rate limiting, coalescing) runs unchanged while responses come from a
+synthetic catalog instead of the network.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List
+from xml.sax.saxutils import escape
+
+import httpx
+
+BODIES = ["Sedan", "SUV", "Coupe", "Hatchback", "Pickup", "Wagon"]
+DRIVES = ["Front Wheel Drive", "All Wheel Drive", "Rear Wheel Drive", "4WD"]
+TRANSMISSIONS = ["Automatic", "Manual", "CVT", "Automated Manual"]
+FUELS = ["Gasoline", "Diesel", "Electric", "Hybrid"]
+
+
+@dataclass
+class Catalog:
+    """Deterministic synthetic catalog: every make sells every model in every year."""
+
+    makes: int = 20
+    models_per_make: int = 8
+    trims_per_model: int = 6
+    start_year: int = 2020
+    end_year: int = 2024
+
+    def make_names(self) -> List[str]:
+        return [f"Stubmake {index:03d}" for index in range(self.makes)]
+
+    def model_names(self, make: str) -> List[str]:
+        return [f"{make.split()[-1]}-Model {index:02d}" for index in range(self.models_per_make)]
+
+    def years(self) -> range:
+        return range(self.start_year, self.end_year + 1)
+
+    def trim_count(self) -> int:
+        return self.makes * self.models_per_make * self.trims_per_model * len(self.years())
+
+    def trims(self, make: str, model: str, year: int) -> List[Dict[str, Any]]:
+        seed = sum(map(ord, model)) + year
+        return [
+            {
+                "model_make_id": make.lower().replace(" ", "-"),
+                "model_name": model,
+                "model_trim": f"Trim {index}",
+                "model_year": year,
+                "model_body": BODIES[(seed + index) % len(BODIES)],
+                "model_doors": str(2 + 2 * ((seed + index) % 2)),
+                "model_drive": DRIVES[(seed + index) % len(DRIVES)],
+                "model_transmission_type": TRANSMISSIONS[(seed + index) % len(TRANSMISSIONS)],
+                "model_engine_fuel": FUELS[(seed + index) % len(FUELS)],
+            }
+            for index in range(self.trims_per_model)
+        ]
+
+
+class StubUpstreams(httpx.AsyncBaseTransport):
+    """Serves `catalog` with a fixed per-request latency and a seeded 503 rate.
+
+    Whether a request fails depends only on its URL and attempt number, not
+    on the order concurrent requests arrive in, so every run of a scenario
+    sees the same failures.
+    """
+
+    # CarQuery truncates large getTrims responses; the planner splits on it.
+    CARQUERY_RESULT_LIMIT = 500
+
+    def __init__(self, catalog: Catalog, *, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0) -> None:
+        self.catalog = catalog
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.requests: Dict[str, int] = {}
+        self.attempts: Dict[str, int] = {}
+        self.makes = {make.lower(): make for make in catalog.make_names()}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.requests[host] = self.requests.get(host, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.error_rate and self._fails(str(request.url)):
+            return httpx.Response(503, headers={"Retry-After": "0"}, request=request)
+        params = dict(request.url.params)
+        if host == "www.carqueryapi.com":
+            payload = self._carquery(params)
+            return httpx.Response(200, text=f"callback({json.dumps(payload)});", request=request)
+        if host == "vpic.nhtsa.dot.gov":
+            return httpx.Response(200, json=self._vpic(request.url.path), request=request)
+        if host == "www.fueleconomy.gov":
+            return httpx.Response(200, text=self._doe(request.url.path, params), request=request)
+        return httpx.Response(404, request=request)
+
+    def _fails(self, url: str) -> bool:
+        attempt = self.attempts[url] = self.attempts.get(url, 0) + 1
+        return random.Random(f"{self.seed}:{url}:{attempt}").random() < self.error_rate
+
+    def _make(self, name: str | None) -> str | None:
+        return self.makes.get((name or "").lower())
+
+    def _carquery(self, params: Dict[str, str]) -> Dict[str, Any]:
+        catalog = self.catalog
+        command = params.get("cmd")
+        if command == "getMakes":
+            return {
+                "Makes": [
+                    {"make_id": make.lower().replace(" ", "-"), "make_display": make, "make_country": "USA"}
+                    for make in catalog.make_names()
+                ]
+            }
+        make = self._make(params.get("make"))
+        if make is None:
+            return {"Models": []} if command == "getModels" else {"Trims": []}
+        if command == "getModels":
+            return {"Models": [{"model_name": model, "model_make_id": make.lower()} for model in catalog.model_names(make)]}
+        if "model" in params:
+            models = [model for model in catalog.model_names(make) if model.lower() == params["model"].lower()]
+            years = [int(params["year"])]
+        else:
+            models = catalog.model_names(make)
+            years = list(range(int(params["min_year"]), int(params["max_year"]) + 1))
+        trims = [trim for year in years if year in catalog.years() for model in models for trim in catalog.trims(make, model, year)]
+        return {"Trims": trims[: self.CARQUERY_RESULT_LIMIT]}
+
+    def _vpic(self, path: str) -> Dict[str, Any]:
+        # /api/vehicles/GetModelsForMakeYear/make/<make>/modelyear/<year>
+        parts = path.split("/")
+        make = self._make(parts[parts.index("make") + 1]) if "make" in parts else None
+        models = self.catalog.model_names(make) if make else []
+        return {"Count": len(models), "Results": [{"Model_Name": model} for model in models]}
+
+    def _doe(self, path: str, params: Dict[str, str]) -> str:
+        if path.endswith("/make"):
+            names = self.catalog.make_names()
+        else:
+            make = self._make(params.get("make"))
+            names = self.catalog.model_names(make) if make else []
+        items = "".join(f"<menuItem><text>{escape(name)}</text><value>{escape(name)}</value></menuItem>" for name in names)
+        return f"<menuItems>{items}</menuItems>"
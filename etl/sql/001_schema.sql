@@ -47,3 +47,12 @@ CREATE TABLE IF NOT EXISTS trim_evidence (
   payload JSONB NOT NULL,
   observed_at TIMESTAMPTZ DEFAULT NOW()
 );
+
+CREATE TABLE IF NOT EXISTS source_fingerprints (
+  source TEXT NOT NULL,
+  make TEXT NOT NULL,
+  year INT NOT NULL,
+  fingerprint TEXT NOT NULL,
+  updated_at TIMESTAMPTZ,
+  PRIMARY KEY (source, make, year)
+);
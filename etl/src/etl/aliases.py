@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .normalize import normalized_key
+
+
+class AliasMemory:
+    """Persisted record of which CarQuery spellings resolve each make/model.
+
+    Hits are stored per canonical make (for getModels) or canonical
+    make/model pair (for getTrims) and are year-independent: the spelling
+    that worked once is tried first next time. Misses (a spelling that came
+    back empty) are stored per exact query and year so they can be skipped.
+    Both kinds expire after `ttl_days`.
+    """
+
+    def __init__(self, path: Optional[Path] = None, *, ttl_days: float = 30.0) -> None:
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.hits: Dict[str, Dict[str, Any]] = {}
+        self.misses: Dict[str, float] = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Path, *, ttl_days: float = 30.0) -> "AliasMemory":
+        memory = cls(path, ttl_days=ttl_days)
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return memory
+        now = time.time()
+        memory.hits = {key: hit for key, hit in data.get("hits", {}).items() if hit.get("expires_at", 0) > now}
+        memory.misses = {key: expires_at for key, expires_at in data.get("misses", {}).items() if expires_at > now}
+        return memory
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"hits": self.hits, "misses": self.misses}, sort_keys=True))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    @staticmethod
+    def _hit_key(canonical_make: str, canonical_model: Optional[str]) -> str:
+        if canonical_model is None:
+            return f"models|{normalized_key(canonical_make)}"
+        return f"trims|{normalized_key(canonical_make)}|{normalized_key(canonical_model)}"
+
+    @staticmethod
+    def _miss_key(make: str, model: Optional[str], sold_in_us: bool, year: int) -> str:
+        return f"{make.lower()}|{(model or '').lower()}|{int(sold_in_us)}|{year}"
+
+    def preferred(self, canonical_make: str, canonical_model: Optional[str] = None) -> Optional[Tuple[str, Optional[str], bool]]:
+        """Return the (make, model, sold_in_us) spelling that last worked, if any."""
+        hit = self.hits.get(self._hit_key(canonical_make, canonical_model))
+        if hit is None or hit["expires_at"] <= time.time():
+            return None
+        return hit["make"], hit.get("model"), hit["sold_in_us"]
+
+    def record_hit(
+        self,
+        canonical_make: str,
+        canonical_model: Optional[str],
+        *,
+        make: str,
+        model: Optional[str],
+        sold_in_us: bool,
+    ) -> None:
+        self.hits[self._hit_key(canonical_make, canonical_model)] = {
+            "make": make,
+            "model": model,
+            "sold_in_us": sold_in_us,
+            "expires_at": time.time() + self.ttl,
+        }
+        self.dirty = True
+
+    def is_miss(self, make: str, model: Optional[str], sold_in_us: bool, year: int) -> bool:
+        expires_at = self.misses.get(self._miss_key(make, model, sold_in_us, year))
+        return expires_at is not None and expires_at > time.time()
+
+    def record_miss(self, make: str, model: Optional[str], sold_in_us: bool, year: int) -> None:
+        self.misses[self._miss_key(make, model, sold_in_us, year)] = time.time() + self.ttl
+        self.dirty = True
+
+
+def order_attempts(
+    attempts: List[Tuple[str, Optional[str], bool]],
+    preferred: Optional[Tuple[str, Optional[str], bool]],
+) -> List[Tuple[str, Optional[str], bool]]:
+    """Move the remembered spelling to the front of the probe order."""
+    if preferred is None:
+        return attempts
+    wanted = (preferred[0].lower(), (preferred[1] or "").lower(), preferred[2])
+    for index, (make, model, sold_in_us) in enumerate(attempts):
+        if (make.lower(), (model or "").lower(), sold_in_us) == wanted:
+            return [attempts[index]] + attempts[:index] + attempts[index + 1 :]
+    return [preferred] + attempts
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Protocol
+
+from . import codec
+
+CACHE_META_KEY = "_cache"
+SQLITE_FILENAME = "http_cache.sqlite3"
+
+
+@dataclass
+class CacheEntry:
+    kind: str  # "json" or "text"
+    body: Any
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    size: int = 0  # stored bytes, filled in by the backend on read/write (not persisted)
+
+    def validators(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class CacheBackend(Protocol):
+    def read(self, key: str) -> CacheEntry | None: ...
+
+    def read_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]: ...
+
+    def write(self, key: str, entry: CacheEntry) -> int:
+        """Store `entry` and return the number of bytes written."""
+        ...
+
+    def delete(self, key: str) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class FileCacheBackend:
+    """One `<key>.json` file per entry; the original cache layout."""
+
+    def __init__(self, cache_dir: str | Path) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def read(self, key: str) -> CacheEntry | None:
+        path = self.path_for(key)
+        try:
+            text = path.read_text()
+            data = codec.loads(text)
+            mtime = path.stat().st_mtime
+            size = len(text)
+        except (OSError, codec.JSONDecodeError):
+            return None
+        meta = data.get(CACHE_META_KEY) if isinstance(data, dict) else None
+        if meta is None:
+            # Written before entries carried metadata: a bare JSON body.
+            return CacheEntry(kind="json", body=data, fetched_at=mtime, size=size)
+        return CacheEntry(
+            kind=meta["kind"],
+            body=data.get("body"),
+            fetched_at=meta.get("fetched_at", mtime),
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            size=size,
+        )
+
+    def read_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        entries: Dict[str, CacheEntry] = {}
+        for key in keys:
+            entry = self.read(key)
+            if entry is not None:
+                entries[key] = entry
+        return entries
+
+    def write(self, key: str, entry: CacheEntry) -> int:
+        meta = {
+            "kind": entry.kind,
+            "fetched_at": entry.fetched_at,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+        }
+        # Write to a private temp file and rename over the target so concurrent
+        # readers see either the old entry or the new one, never a torn file.
+        path = self.path_for(key)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        text = codec.dumps({CACHE_META_KEY: meta, "body": entry.body})
+        try:
+            tmp_path.write_text(text)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return len(text)
+
+    def delete(self, key: str) -> None:
+        self.path_for(key).unlink(missing_ok=True)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteCacheBackend:
+    """Single-file cache with zlib-compressed bodies and LRU eviction.
+
+    When `max_bytes` is set, the least recently read entries are evicted
+    after a write pushes the stored (compressed) size over the cap. Reads use
+    one connection per thread and never take the write lock (WAL mode);
+    access times are buffered in memory and applied on the next write.
+    """
+
+    BATCH_SIZE = 500
+
+    def __init__(self, path: str | Path, *, max_bytes: Optional[int] = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+        self.connections: list[sqlite3.Connection] = []
+        self.write_lock = threading.Lock()
+        self.pending_access: Dict[str, float] = {}
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+              key TEXT PRIMARY KEY,
+              kind TEXT NOT NULL,
+              fetched_at REAL NOT NULL,
+              etag TEXT,
+              last_modified TEXT,
+              body BLOB NOT NULL,
+              size INTEGER NOT NULL,
+              accessed_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self.total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            self.local.conn = conn
+            with self.write_lock:
+                self.connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _entry(row: tuple) -> CacheEntry:
+        kind, fetched_at, etag, last_modified, body = row
+        return CacheEntry(
+            kind=kind,
+            body=codec.loads(zlib.decompress(body)),
+            fetched_at=fetched_at,
+            etag=etag,
+            last_modified=last_modified,
+            size=len(body),
+        )
+
+    def read(self, key: str) -> CacheEntry | None:
+        return self.read_many([key]).get(key)
+
+    def read_many(self, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        keys = list(keys)
+        entries: Dict[str, CacheEntry] = {}
+        conn = self._conn()
+        for offset in range(0, len(keys), self.BATCH_SIZE):
+            chunk = keys[offset : offset + self.BATCH_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = conn.execute(
+                f"SELECT key, kind, fetched_at, etag, last_modified, body FROM entries WHERE key IN ({placeholders})",
+                chunk,
+            ).fetchall()
+            for row in rows:
+                entries[row[0]] = self._entry(row[1:])
+        # Reader threads merge under the lock; write() and close() swap the dict out under it.
+        accessed = dict.fromkeys(entries, time.time())
+        with self.write_lock:
+            self.pending_access.update(accessed)
+        return entries
+
+    def _flush_access(self, conn: sqlite3.Connection) -> None:
+        # Caller holds write_lock.
+        if not self.pending_access:
+            return
+        pending, self.pending_access = self.pending_access, {}
+        conn.executemany(
+            "UPDATE entries SET accessed_at = ? WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in pending.items()],
+        )
+
+    def write(self, key: str, entry: CacheEntry) -> int:
+        body = zlib.compress(codec.dumps(entry.body).encode())
+        conn = self._conn()
+        with self.write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._flush_access(conn)
+                previous = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO entries (key, kind, fetched_at, etag, last_modified, body, size, accessed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (key, entry.kind, entry.fetched_at, entry.etag, entry.last_modified, body, len(body), time.time()),
+                )
+                self.total_bytes += len(body) - (previous[0] if previous else 0)
+                if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+                    self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return len(body)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # Trim to 90% of the cap so a full cache does not evict on every write.
+        target = int(self.max_bytes * 0.9)
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+        victims = []
+        for key, size in rows:
+            if self.total_bytes <= target:
+                break
+            victims.append((key,))
+            self.total_bytes -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def delete(self, key: str) -> None:
+        conn = self._conn()
+        with self.write_lock:
+            row = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.total_bytes -= row[0]
+
+    def close(self) -> None:
+        with self.write_lock:
+            if self.connections:
+                self._flush_access(self.connections[0])
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+
+def create_backend(name: str, cache_dir: str | Path, *, max_bytes: Optional[int] = None) -> CacheBackend:
+    if name == "file":
+        return FileCacheBackend(cache_dir)
+    if name == "sqlite":
+        return SQLiteCacheBackend(Path(cache_dir) / SQLITE_FILENAME, max_bytes=max_bytes)
+    raise ValueError(f"Unknown cache backend: {name!r} (expected 'file' or 'sqlite')")
@@ -23,9 +23,16 @@ def sync_vehicles(
     dry_run: bool = typer.Option(False, help="Run without writing to database"),
     use_cache: bool = typer.Option(True, help="Use HTTP response cache"),
     dq_report: Optional[str] = typer.Option(None, help="Write DQ report to path"),
+    resume: bool = typer.Option(False, help="Continue an interrupted run from its progress journal"),
+    offline: bool = typer.Option(False, help="Serve every request from the fixture bundle; fail on misses"),
+    record: bool = typer.Option(False, help="Record every response into the fixture bundle"),
+    fixtures: Optional[str] = typer.Option(None, envvar="FIXTURES_DIR", help="Fixture bundle directory"),
+    profile: bool = typer.Option(False, help="Write per-year cProfile and event-loop timing artifacts"),
 ):
     if dry_run:
         console.log("[yellow]Dry-run mode: database changes will not be persisted")
+    if offline:
+        console.log("[yellow]Offline mode: replaying recorded fixtures, no network access")
     settings = build_settings(
         database_url=database_url,
         start_year=start_year,
@@ -35,6 +42,11 @@ def sync_vehicles(
         dry_run=dry_run,
         use_cache=use_cache,
         dq_report_path=dq_report,
+        resume=resume,
+        offline=offline,
+        record=record,
+        fixtures_dir=fixtures,
+        profile=profile,
     )
     asyncio.run(sync(settings))
 
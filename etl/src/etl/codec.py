@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is used without it
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch
+# this whichever codec is in use.
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> str:
+    """Compact JSON text. Only for stored payloads, never for cache keys or
+    fingerprints: the two codecs do not produce byte-identical output."""
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, separators=(",", ":"))
+
+
+def strip_jsonp(text: str) -> str:
+    """Return the JSON inside a `callback(...)` or `callback(...);` wrapper.
+
+    Slices between the first "(" and the closing ")" instead of matching a
+    regex over the whole body; text without a wrapper is returned as is.
+    """
+    text = text.strip()
+    end = len(text) - 1 if text.endswith(";") else len(text)
+    if end < 1 or text[end - 1] != ")":
+        return text
+    start = text.find("(", 0, end - 1)
+    if start <= 0:
+        return text
+    return text[start + 1 : end - 1]
@@ -16,9 +16,28 @@ class Settings:
     cache_dir: str = os.path.join(os.getcwd(), "etl", "cache")
     reports_dir: str = os.path.join(os.getcwd(), "etl", "reports")
     use_cache: bool = True
+    cache_ttl_seconds: Optional[float] = float(os.environ["CACHE_TTL_SECONDS"]) if os.getenv("CACHE_TTL_SECONDS") else None
+    cache_backend: str = os.getenv("CACHE_BACKEND", "file")
+    cache_max_bytes: Optional[int] = int(os.environ["CACHE_MAX_BYTES"]) if os.getenv("CACHE_MAX_BYTES") else None
     max_workers: int = int(os.getenv("MAX_WORKERS", "8"))
+    years_in_flight: int = int(os.getenv("YEARS_IN_FLIGHT", "2"))
+    bulk_fetch: bool = os.getenv("BULK_FETCH", "1") != "0"
+    incremental: bool = os.getenv("INCREMENTAL", "1") != "0"
+    touch_unchanged: bool = os.getenv("TOUCH_UNCHANGED", "1") != "0"
     http_timeout: float = float(os.getenv("HTTP_TIMEOUT", "20"))
+    evidence_flush_size: int = int(os.getenv("EVIDENCE_FLUSH_SIZE", "1000"))
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "2"))
     dq_report_path: Optional[str] = None
+    metrics_dir: Optional[str] = os.getenv("METRICS_DIR")
+    profile: bool = False
+    profile_dir: Optional[str] = os.getenv("PROFILE_DIR")
+    alias_memory_path: str = os.getenv("ALIAS_MEMORY_PATH", os.path.join(os.getcwd(), "etl", "cache", "carquery_aliases.json"))
+    alias_ttl_days: float = float(os.getenv("ALIAS_TTL_DAYS", "30"))
+    journal_path: str = os.getenv("SYNC_JOURNAL_PATH", os.path.join(os.getcwd(), "etl", "cache", "sync_journal.jsonl"))
+    resume: bool = False
+    fixtures_dir: str = os.getenv("FIXTURES_DIR", os.path.join(os.getcwd(), "etl", "fixtures"))
+    offline: bool = False
+    record: bool = False
 
 
 def build_settings(
@@ -31,10 +50,17 @@ def build_settings(
     dry_run: bool,
     use_cache: bool,
     dq_report_path: Optional[str],
+    resume: bool = False,
+    offline: bool = False,
+    record: bool = False,
+    fixtures_dir: Optional[str] = None,
+    profile: bool = False,
 ) -> Settings:
     db_url = database_url or os.getenv("DATABASE_URL")
     if not db_url:
         raise ValueError("DATABASE_URL must be provided via flag or environment variable")
+    if offline and record:
+        raise ValueError("--offline and --record are mutually exclusive")
     return Settings(
         database_url=db_url,
         start_year=start_year,
@@ -44,4 +70,9 @@ def build_settings(
         dry_run=dry_run,
         use_cache=use_cache,
         dq_report_path=dq_report_path,
+        resume=resume,
+        offline=offline,
+        record=record,
+        fixtures_dir=fixtures_dir or Settings.fixtures_dir,
+        profile=profile,
     )
@@ -1,15 +1,29 @@
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Any, Dict, Iterable, Optional
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar, Union
 
-from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, create_engine, select, text, func, update
+from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, UniqueConstraint, create_engine, event, literal, select, text, true, func, update
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.util import await_only
+
+from . import codec
 
 metadata = MetaData()
 
+# Helpers take either an Engine (one transaction per call) or a Connection
+# (joining the caller's transaction, e.g. inside AsyncDatabase.run).
+Bind = Union[Engine, Connection]
+T = TypeVar("T")
+
 makes = Table(
     "makes",
     metadata,
@@ -34,6 +48,7 @@ models = Table(
     Column("source", String, nullable=False),
     Column("source_key", String),
     Column("last_verified_at", DateTime(timezone=True)),
+    UniqueConstraint("make_id", "normalized_name"),
 )
 
 trims = Table(
@@ -54,6 +69,7 @@ trims = Table(
     Column("source_key", String),
     Column("is_active", Boolean, default=True),
     Column("last_verified_at", DateTime(timezone=True)),
+    UniqueConstraint("model_id", "year", "normalized_trim_name"),
 )
 
 trim_evidence = Table(
@@ -66,20 +82,99 @@ trim_evidence = Table(
     Column("observed_at", DateTime(timezone=True), server_default=func.now()),
 )
 
+source_fingerprints = Table(
+    "source_fingerprints",
+    metadata,
+    Column("source", String, primary_key=True),
+    Column("make", String, primary_key=True),
+    Column("year", Integer, primary_key=True),
+    Column("fingerprint", String, nullable=False),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
 
 def get_engine(database_url: str) -> Engine:
     if database_url.startswith("postgresql://"):
         database_url = database_url.replace("postgresql://", "postgresql+psycopg://", 1)
-    return create_engine(database_url, future=True)
+    if database_url in ("sqlite://", "sqlite:///:memory:"):
+        # One shared connection, so AsyncDatabase's worker thread sees the same
+        # in-memory database as the caller.
+        engine = create_engine(database_url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+    else:
+        engine = create_engine(database_url, future=True)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _add_sqlite_functions)
+    return engine
+
+
+def _add_sqlite_functions(dbapi_conn, _record) -> None:
+    # The upserts use PostgreSQL's NULL-skipping least/greatest; SQLite (tests,
+    # benchmarks) only has min/max, which return NULL if any argument is NULL.
+    dbapi_conn.create_function("least", -1, lambda *values: min((v for v in values if v is not None), default=None))
+    dbapi_conn.create_function("greatest", -1, lambda *values: max((v for v in values if v is not None), default=None))
 
 
 @contextmanager
-def begin(engine: Engine):
-    with engine.begin() as conn:
+def begin(bind: Bind):
+    if isinstance(bind, Connection):
+        if bind.in_transaction():
+            yield bind
+        else:
+            with bind.begin():
+                yield bind
+        return
+    with bind.begin() as conn:
         yield conn
 
 
-def upsert_make(engine: Engine, *, name: str, normalized_name: str, source: str, source_key: Optional[str], country: Optional[str] = None) -> int:
+class AsyncDatabase:
+    """Awaitable database access for the sync pipeline.
+
+    `run(fn, *args)` calls `fn(conn, *args)` inside one transaction, so the
+    synchronous helpers in this module are reused as-is. PostgreSQL goes
+    through an AsyncEngine on psycopg's async driver with a pool of
+    `pool_size` connections; statements are awaited and the event loop
+    keeps serving HTTP meanwhile. Other dialects (SQLite in tests and
+    benchmarks) have no async driver here, so their calls run on a single
+    worker thread, which also serializes SQLite's one writer.
+    """
+
+    def __init__(self, engine: Engine, *, pool_size: int = 2) -> None:
+        self.engine = engine
+        self.async_engine = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        if engine.dialect.name == "postgresql":
+            # Imported lazily: the asyncio extension needs greenlet (sqlalchemy[asyncio]).
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            self.async_engine = create_async_engine(engine.url, pool_size=pool_size, max_overflow=0, pool_pre_ping=True)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="etl-db")
+
+    @property
+    def sync_engine(self) -> Engine:
+        """The Engine whose events fire for statements issued through `run`."""
+        return self.async_engine.sync_engine if self.async_engine is not None else self.engine
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self.async_engine is not None:
+            async with self.async_engine.begin() as conn:
+                return await conn.run_sync(fn, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(self._run_in_thread, fn, *args, **kwargs))
+
+    def _run_in_thread(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with begin(self.engine) as conn:
+            return fn(conn, *args, **kwargs)
+
+    async def dispose(self) -> None:
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+
+def upsert_make(bind: Bind, *, name: str, normalized_name: str, source: str, source_key: Optional[str], country: Optional[str] = None) -> int:
     stmt = insert(makes).values(
         name=name,
         normalized_name=normalized_name,
@@ -98,13 +193,13 @@ def upsert_make(engine: Engine, *, name: str, normalized_name: str, source: str,
             "last_verified_at": stmt.excluded.last_verified_at,
         },
     ).returning(makes.c.id)
-    with begin(engine) as conn:
+    with begin(bind) as conn:
         result = conn.execute(stmt)
         return result.scalar_one()
 
 
 def upsert_model(
-    engine: Engine,
+    bind: Bind,
     *,
     make_id: int,
     name: str,
@@ -143,13 +238,12 @@ def upsert_model(
             "last_verified_at": stmt.excluded.last_verified_at,
         },
     ).returning(models.c.id)
-    with begin(engine) as conn:
+    with begin(bind) as conn:
         result = conn.execute(stmt)
         return result.scalar_one()
 
 
-def upsert_trim(
-    engine: Engine,
+def trim_row(
     *,
     model_id: int,
     year: int,
@@ -159,8 +253,8 @@ def upsert_trim(
     source: str,
     source_key: Optional[str],
     market: str = "US",
-) -> int:
-    payload = {
+) -> Dict[str, Any]:
+    return {
         "model_id": model_id,
         "year": year,
         "trim_name": trim_name,
@@ -176,59 +270,352 @@ def upsert_trim(
         "is_active": True,
         "last_verified_at": dt.datetime.utcnow(),
     }
-    stmt = insert(trims).values(**payload)
-    stmt = stmt.on_conflict_do_update(
-        index_elements=[trims.c.model_id, trims.c.year, trims.c.normalized_trim_name],
-        set_={
-            "trim_name": stmt.excluded.trim_name,
-            "body": stmt.excluded.body,
-            "doors": stmt.excluded.doors,
-            "drive": stmt.excluded.drive,
-            "transmission": stmt.excluded.transmission,
-            "fuel_type": stmt.excluded.fuel_type,
-            "market": stmt.excluded.market,
-            "source": stmt.excluded.source,
-            "source_key": stmt.excluded.source_key,
-            "is_active": True,
-            "last_verified_at": stmt.excluded.last_verified_at,
-        },
-    ).returning(trims.c.id)
-    with begin(engine) as conn:
-        result = conn.execute(stmt)
-        return result.scalar_one()
 
 
-def insert_trim_evidence(engine: Engine, *, trim_id: int, source: str, payload: Dict[str, Any]) -> None:
-    stmt = insert(trim_evidence).values(trim_id=trim_id, source=source, payload=payload)
-    with begin(engine) as conn:
-        conn.execute(stmt)
+TrimKey = Tuple[int, int, str]
+
+
+EvidenceRow = Tuple[int, str, Dict[str, Any]]
+
+
+class EvidenceBuffer:
+    """Collects trim_evidence rows until there are enough for one bulk load.
+
+    The owner does the writing: `full` says when, and `take()` hands over
+    the rows for `write_evidence` (COPY on PostgreSQL, a batched
+    executemany INSERT elsewhere).
+    """
+
+    def __init__(self, *, flush_size: int = 1000) -> None:
+        self.flush_size = flush_size
+        self.rows: List[EvidenceRow] = []
+
+    @property
+    def full(self) -> bool:
+        return len(self.rows) >= self.flush_size
+
+    def add(self, *, trim_id: int, source: str, payload: Dict[str, Any]) -> None:
+        self.rows.append((trim_id, source, payload))
+
+    def take(self) -> List[EvidenceRow]:
+        rows, self.rows = self.rows, []
+        return rows
+
 
+def write_evidence(bind: Bind, rows: List[EvidenceRow]) -> None:
+    if not rows:
+        return
+    with begin(bind) as conn:
+        if conn.dialect.name == "postgresql":
+            _copy_rows(conn, "trim_evidence", ("trim_id", "source", "payload"), ((t, s, codec.dumps(p)) for t, s, p in rows))
+        else:
+            conn.execute(
+                trim_evidence.insert(),
+                [{"trim_id": trim_id, "source": source, "payload": payload} for trim_id, source, payload in rows],
+            )
 
-def mark_trims_inactive(engine: Engine, *, model_id: int, year: int, active_normalized_trims: Iterable[str]) -> None:
-    active_set = set(active_normalized_trims)
-    with begin(engine) as conn:
-        current = conn.execute(
-            select(trims.c.normalized_trim_name).where(trims.c.model_id == model_id, trims.c.year == year)
-        ).scalars().all()
-        to_inactivate = [name for name in current if name not in active_set]
-        if not to_inactivate:
-            return
+
+def _copy_rows(conn: Connection, table_name: str, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> None:
+    driver_conn = conn.connection.driver_connection
+    statement = f"COPY {table_name} ({', '.join(columns)}) FROM STDIN"
+    if conn.dialect.is_async:
+        # Inside AsyncDatabase.run the driver connection is psycopg's
+        # AsyncConnection; await its COPY from this sync code via greenlet.
+        await_only(_copy_rows_async(driver_conn, statement, rows))
+        return
+    with driver_conn.cursor() as cursor:
+        with cursor.copy(statement) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+async def _copy_rows_async(driver_conn: Any, statement: str, rows: Iterable[Sequence[Any]]) -> None:
+    async with driver_conn.cursor() as cursor:
+        async with cursor.copy(statement) as copy:
+            for row in rows:
+                await copy.write_row(row)
+
+
+TRIM_STAGE_COLUMNS = (
+    "model_id",
+    "trim_name",
+    "normalized_trim_name",
+    "body",
+    "doors",
+    "drive",
+    "transmission",
+    "fuel_type",
+    "market",
+    "source",
+    "source_key",
+    "last_verified_at",
+)
+
+# Session-local staging table for year-level merges; created and dropped inside
+# the merge transaction.
+trims_stage = Table(
+    "trims_stage",
+    MetaData(),
+    Column("model_id", Integer, nullable=False),
+    Column("trim_name", String, nullable=False),
+    Column("normalized_trim_name", String, nullable=False),
+    Column("body", String),
+    Column("doors", Integer),
+    Column("drive", String),
+    Column("transmission", String),
+    Column("fuel_type", String),
+    Column("market", String, nullable=False),
+    Column("source", String, nullable=False),
+    Column("source_key", String),
+    Column("last_verified_at", DateTime(timezone=True)),
+    prefixes=["TEMPORARY"],
+)
+
+
+def merge_year_trims(bind: Bind, year: int, rows: Iterable[Dict[str, Any]]) -> Dict[TrimKey, int]:
+    """Apply every trim observed for `year` in one transaction.
+
+    Rows (built with `trim_row`) are streamed into a temporary staging table,
+    then one INSERT ... SELECT ... ON CONFLICT upserts them and one UPDATE ...
+    WHERE NOT EXISTS inactivates trims of the observed models that were not
+    seen this run. Returns trim ids keyed by (model_id, year, normalized_trim_name).
+    """
+    staged: Dict[Tuple[int, str], Dict[str, Any]] = {}
+    for row in rows:
+        staged[(row["model_id"], row["normalized_trim_name"])] = row
+    ids: Dict[TrimKey, int] = {}
+    if not staged:
+        return ids
+
+    now = dt.datetime.utcnow()
+    with begin(bind) as conn:
+        trims_stage.drop(conn, checkfirst=True)
+        trims_stage.create(conn)
+        if conn.dialect.name == "postgresql":
+            _copy_rows(
+                conn,
+                trims_stage.name,
+                TRIM_STAGE_COLUMNS,
+                ([row[name] for name in TRIM_STAGE_COLUMNS] for row in staged.values()),
+            )
+        else:
+            conn.execute(
+                trims_stage.insert(),
+                [{name: row[name] for name in TRIM_STAGE_COLUMNS} for row in staged.values()],
+            )
+
+        source = select(
+            *[trims_stage.c[name] for name in TRIM_STAGE_COLUMNS],
+            literal(year, Integer).label("year"),
+            true().label("is_active"),
+        ).where(true())
+        stmt = insert(trims).from_select([*TRIM_STAGE_COLUMNS, "year", "is_active"], source)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[trims.c.model_id, trims.c.year, trims.c.normalized_trim_name],
+            set_={
+                "trim_name": stmt.excluded.trim_name,
+                "body": stmt.excluded.body,
+                "doors": stmt.excluded.doors,
+                "drive": stmt.excluded.drive,
+                "transmission": stmt.excluded.transmission,
+                "fuel_type": stmt.excluded.fuel_type,
+                "market": stmt.excluded.market,
+                "source": stmt.excluded.source,
+                "source_key": stmt.excluded.source_key,
+                "is_active": True,
+                "last_verified_at": stmt.excluded.last_verified_at,
+            },
+        ).returning(trims.c.id, trims.c.model_id, trims.c.normalized_trim_name)
+        for trim_id, model_id, normalized_trim_name in conn.execute(stmt):
+            ids[(model_id, year, normalized_trim_name)] = trim_id
+
+        still_observed = (
+            select(trims_stage.c.model_id)
+            .where(
+                trims_stage.c.model_id == trims.c.model_id,
+                trims_stage.c.normalized_trim_name == trims.c.normalized_trim_name,
+            )
+            .exists()
+        )
         conn.execute(
             update(trims)
-            .where(trims.c.model_id == model_id, trims.c.year == year, trims.c.normalized_trim_name.in_(to_inactivate))
-            .values(is_active=False, last_verified_at=dt.datetime.utcnow())
+            .where(
+                trims.c.year == year,
+                trims.c.model_id.in_(select(trims_stage.c.model_id)),
+                ~still_observed,
+            )
+            .values(is_active=False, last_verified_at=now)
         )
+        trims_stage.drop(conn)
+    return ids
+
+
+# Ids whose upsert was skipped: (make ids, model ids, {year: model ids with trims}).
+Touched = Tuple[set[int], set[int], Dict[int, set[int]]]
+
+
+class IdentityMap:
+    """Run-wide cache of make/model ids and the attributes last written for them.
+
+    Loaded once per run so existence checks cost no queries; callers record
+    every upsert so the map stays current, and `touch` ids whose upsert was
+    skipped because nothing changed.
+    """
+
+    def __init__(self) -> None:
+        self.makes: Dict[str, Tuple[int, tuple]] = {}
+        self.models: Dict[Tuple[int, str], Tuple[int, tuple, Optional[int], Optional[int]]] = {}
+        self.touched_makes: set[int] = set()
+        self.touched_models: set[int] = set()
+        self.touched_trims: Dict[int, set[int]] = {}
+
+    @classmethod
+    def load(cls, bind: Bind) -> "IdentityMap":
+        identity = cls()
+        with begin(bind) as conn:
+            for row in conn.execute(
+                select(makes.c.id, makes.c.normalized_name, makes.c.name, makes.c.source, makes.c.source_key, makes.c.country)
+            ):
+                identity.makes[row.normalized_name] = (row.id, make_signature(row.name, row.source, row.source_key, row.country))
+            for row in conn.execute(
+                select(
+                    models.c.id,
+                    models.c.make_id,
+                    models.c.normalized_name,
+                    models.c.name,
+                    models.c.source,
+                    models.c.source_key,
+                    models.c.first_year,
+                    models.c.last_year,
+                )
+            ):
+                identity.models[(row.make_id, row.normalized_name)] = (
+                    row.id,
+                    model_signature(row.name, row.source, row.source_key),
+                    row.first_year,
+                    row.last_year,
+                )
+        return identity
+
+    def make_id(self, normalized_name: str, signature: tuple) -> Tuple[Optional[int], bool]:
+        """Return (id, unchanged) for a make; id is None when the make is new."""
+        known = self.makes.get(normalized_name)
+        if known is None:
+            return None, False
+        return known[0], known[1] == signature
+
+    def model_id(self, make_id: int, normalized_name: str, signature: tuple, year: int) -> Tuple[Optional[int], bool]:
+        """Return (id, unchanged) for a model; unchanged also requires `year` within its range."""
+        known = self.models.get((make_id, normalized_name))
+        if known is None:
+            return None, False
+        model_id, known_signature, first_year, last_year = known
+        in_range = first_year is not None and last_year is not None and first_year <= year <= last_year
+        return model_id, known_signature == signature and in_range
 
+    def remember_make(self, normalized_name: str, make_id: int, signature: tuple) -> None:
+        self.makes[normalized_name] = (make_id, signature)
 
-def get_model_id(engine: Engine, make_id: int, normalized_model: str) -> Optional[int]:
-    with begin(engine) as conn:
-        row = conn.execute(
-            select(models.c.id).where(models.c.make_id == make_id, models.c.normalized_name == normalized_model)
-        ).fetchone()
-        return row[0] if row else None
+    def remember_model(self, make_id: int, normalized_name: str, model_id: int, signature: tuple, year: int) -> None:
+        known = self.models.get((make_id, normalized_name))
+        first_year, last_year = year, year
+        if known is not None:
+            first_year = min(y for y in (known[2], year) if y is not None)
+            last_year = max(y for y in (known[3], year) if y is not None)
+        self.models[(make_id, normalized_name)] = (model_id, signature, first_year, last_year)
 
+    def touch_make(self, make_id: int) -> None:
+        self.touched_makes.add(make_id)
 
-def get_make_id(engine: Engine, normalized_make: str) -> Optional[int]:
-    with begin(engine) as conn:
-        row = conn.execute(select(makes.c.id).where(makes.c.normalized_name == normalized_make)).fetchone()
-        return row[0] if row else None
+    def touch_model(self, model_id: int) -> None:
+        self.touched_models.add(model_id)
+
+    def touch_trims(self, year: int, model_ids: Iterable[int]) -> None:
+        """Mark the active trims of `model_ids` for `year` as verified without rewriting them."""
+        self.touched_trims.setdefault(year, set()).update(model_ids)
+
+    def take_touched(self, through_year: Optional[int] = None) -> Touched:
+        """Hand over (and reset) the ids touched so far, for `write_touched`.
+
+        With `through_year`, touched trims of later years are kept for a later
+        flush, so each year's trims are bumped by a single UPDATE.
+        """
+        taken_trims = self.touched_trims
+        kept_trims: Dict[int, set[int]] = {}
+        if through_year is not None:
+            kept_trims = {year: ids for year, ids in taken_trims.items() if year > through_year}
+            taken_trims = {year: ids for year, ids in taken_trims.items() if year <= through_year}
+        touched = (self.touched_makes, self.touched_models, taken_trims)
+        self.touched_makes, self.touched_models, self.touched_trims = set(), set(), kept_trims
+        return touched
+
+
+def write_touched(bind: Bind, touched: Touched) -> None:
+    """Bump last_verified_at for skipped rows with one UPDATE per table (and trim year)."""
+    touched_makes, touched_models, touched_trims = touched
+    if not touched_makes and not touched_models and not touched_trims:
+        return
+    now = dt.datetime.utcnow()
+    with begin(bind) as conn:
+        if touched_makes:
+            conn.execute(update(makes).where(makes.c.id.in_(touched_makes)).values(last_verified_at=now))
+        if touched_models:
+            conn.execute(update(models).where(models.c.id.in_(touched_models)).values(last_verified_at=now))
+        for year, model_ids in touched_trims.items():
+            conn.execute(
+                update(trims)
+                .where(trims.c.year == year, trims.c.model_id.in_(model_ids), trims.c.is_active.is_(True))
+                .values(last_verified_at=now)
+            )
+
+
+def _key_text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def make_signature(name: str, source: str, source_key: Any, country: Optional[str]) -> tuple:
+    return (name, source, _key_text(source_key), country)
+
+
+def model_signature(name: str, source: str, source_key: Any) -> tuple:
+    return (name, source, _key_text(source_key))
+
+
+FingerprintKey = Tuple[str, str, int]
+
+
+def payload_fingerprint(payload: Any) -> str:
+    """Stable sha256 of a JSON-serializable payload (key order and whitespace independent)."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def load_fingerprints(bind: Bind) -> Dict[FingerprintKey, str]:
+    """Return every stored slice fingerprint keyed by (source, normalized make, year)."""
+    with begin(bind) as conn:
+        rows = conn.execute(
+            select(
+                source_fingerprints.c.source,
+                source_fingerprints.c.make,
+                source_fingerprints.c.year,
+                source_fingerprints.c.fingerprint,
+            )
+        )
+        return {(row.source, row.make, row.year): row.fingerprint for row in rows}
+
+
+def save_fingerprints(bind: Bind, fingerprints: Dict[FingerprintKey, str]) -> None:
+    if not fingerprints:
+        return
+    now = dt.datetime.utcnow()
+    rows = [
+        {"source": source, "make": make, "year": year, "fingerprint": fingerprint, "updated_at": now}
+        for (source, make, year), fingerprint in fingerprints.items()
+    ]
+    stmt = insert(source_fingerprints).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[source_fingerprints.c.source, source_fingerprints.c.make, source_fingerprints.c.year],
+        set_={"fingerprint": stmt.excluded.fingerprint, "updated_at": stmt.excluded.updated_at},
+    )
+    with begin(bind) as conn:
+        conn.execute(stmt)
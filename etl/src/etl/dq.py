@@ -1,28 +1,132 @@
 from __future__ import annotations
 
+import contextlib
 import csv
 import datetime as dt
+import re
 from pathlib import Path
-from typing import Dict, Iterable, List
+from typing import IO, Dict, Iterable, Optional, Set, Tuple
 
 from rich.console import Console
 
+from . import codec
+
 console = Console()
 
+# An anomaly reported twice with the same values here is written once.
+DEDUPE_FIELDS = ("type", "year", "make", "model")
 
-def write_report(path: Path, rows: Iterable[Dict[str, str]]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    rows = list(rows)
-    if not rows:
-        console.log(f"[green]No anomalies detected; skipping report {path}")
-        return
-    fieldnames = sorted({key for row in rows for key in row.keys()})
-    with path.open("w", newline="") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
+AnomalyKey = Tuple[str, ...]
+
+# Names written by default_report_path; hand-named reports (dq_latest.csv) are never diffed against.
+TIMESTAMPED_REPORT_RE = re.compile(r"dq_\d{8}_\d{6}\.csv")
+
+
+def anomaly_key(row: Dict[str, str]) -> AnomalyKey:
+    return tuple(row.get(field) or "" for field in DEDUPE_FIELDS)
+
+
+def previous_report(path: Path) -> Optional[Path]:
+    """The report the next run at `path` is diffed against.
+
+    A fixed report path is its own previous report; timestamped reports
+    compare with the newest other `dq_<YYYYMMDD_HHMMSS>.csv` in the same
+    directory.
+    """
+    if path.exists():
+        return path
+    candidates = sorted(
+        candidate
+        for candidate in path.parent.glob("dq_*.csv")
+        if candidate != path and TIMESTAMPED_REPORT_RE.fullmatch(candidate.name)
+    )
+    return candidates[-1] if candidates else None
+
+
+def _report_keys(path: Path) -> Set[AnomalyKey]:
+    with path.open(newline="") as csvfile:
+        return {anomaly_key(row) for row in csv.DictReader(csvfile)}
+
+
+class ReportWriter:
+    """Streams anomalies to `<report>.jsonl` as they are produced.
+
+    Rows are deduplicated by DEDUPE_FIELDS on the way in, so only their keys
+    and the set of column names stay in memory. `close` re-reads the JSONL
+    once to write the CSV report (columns are every key seen, sorted) and,
+    when an earlier report exists, `<report>_new.csv` holding only the rows
+    that report did not have.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.jsonl_path = path.with_suffix(".jsonl")
+        self.previous = previous_report(path)
+        self.keys: Set[AnomalyKey] = set()
+        self.fieldnames: Set[str] = set()
+        self.duplicates = 0
+        self.handle: Optional[IO[str]] = None
+
+    def write(self, rows: Iterable[Dict[str, str]]) -> None:
         for row in rows:
-            writer.writerow(row)
-    console.log(f"[yellow]Wrote DQ report to {path} ({len(rows)} anomalies)")
+            key = anomaly_key(row)
+            if key in self.keys:
+                self.duplicates += 1
+                continue
+            self.keys.add(key)
+            self.fieldnames.update(row)
+            if self.handle is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.handle = self.jsonl_path.open("w")
+            self.handle.write(codec.dumps(row) + "\n")
+        if self.handle is not None:
+            # Once per call (a year's rows), so a long run's report is readable as it goes.
+            self.handle.flush()
+
+    def close(self, *, completed: bool = True) -> None:
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        if not completed:
+            # A failed run's rows are journaled; the resumed run reports them.
+            self.jsonl_path.unlink(missing_ok=True)
+            return
+        previous_keys = _report_keys(self.previous) if self.previous is not None else None
+        if not self.keys:
+            console.log(f"[green]No anomalies detected; skipping report {self.path}")
+        else:
+            self._write_csv(previous_keys)
+            console.log(
+                f"[yellow]Wrote DQ report to {self.path} ({len(self.keys)} anomalies, "
+                f"{self.duplicates} duplicates dropped)"
+            )
+        if previous_keys is not None:
+            new = len(self.keys - previous_keys)
+            resolved = len(previous_keys - self.keys)
+            console.log(f"DQ diff against {self.previous.name}: {new} new, {resolved} resolved")
+
+    def _write_csv(self, previous_keys: Optional[Set[AnomalyKey]]) -> None:
+        fieldnames = sorted(self.fieldnames)
+        with contextlib.ExitStack() as stack:
+            rows = stack.enter_context(self.jsonl_path.open())
+            writer = csv.DictWriter(stack.enter_context(self.path.open("w", newline="")), fieldnames=fieldnames)
+            writer.writeheader()
+            new_writer = None
+            if previous_keys is not None:
+                new_path = self.path.with_name(f"{self.path.stem}_new.csv")
+                new_writer = csv.DictWriter(stack.enter_context(new_path.open("w", newline="")), fieldnames=fieldnames)
+                new_writer.writeheader()
+            for line in rows:
+                row = codec.loads(line)
+                writer.writerow(row)
+                if new_writer is not None and anomaly_key(row) not in previous_keys:
+                    new_writer.writerow(row)
+
+
+def write_report(path: Path, rows: Iterable[Dict[str, str]]) -> None:
+    report = ReportWriter(path)
+    report.write(rows)
+    report.close()
 
 
 def default_report_path(reports_dir: Path) -> Path:
@@ -1,66 +1,310 @@
 from __future__ import annotations
 
 import asyncio
+import email.utils
 import hashlib
 import json
 import os
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import httpx
 from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 
+from . import codec
+from .cache import CacheBackend, CacheEntry, FileCacheBackend, create_backend
+from .metrics import Metrics
+
 
 class HTTPCache:
-    def __init__(self, cache_dir: str, enabled: bool = True) -> None:
+    """Response cache in front of a pluggable storage backend.
+
+    Entries carry fetch time and ETag/Last-Modified validators. Entries older
+    than `ttl` seconds are stale and get revalidated by HTTPClient; a `ttl` of
+    None keeps entries fresh forever. Defaults to the one-file-per-entry
+    backend under `cache_dir`.
+
+    Backend calls run in the default thread-pool executor so disk I/O never
+    blocks the event loop; backends handle their own write atomicity.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        enabled: bool = True,
+        ttl: Optional[float] = None,
+        backend: CacheBackend | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.enabled = enabled
-        self.lock = asyncio.Lock()
+        self.ttl = ttl
+        # A disabled cache never touches disk, so no backend is created for it.
+        self.backend = backend or (FileCacheBackend(self.cache_dir) if enabled else None)
+        self.metrics = metrics or Metrics()
 
-    def _path_for(self, url: str, params: Dict[str, Any] | None) -> Path:
+    def _count_lookup(self, entry: CacheEntry | None) -> None:
+        if entry is None:
+            self.metrics.inc("cache_misses_total")
+        else:
+            self.metrics.inc("cache_hits_total")
+            self.metrics.inc("cache_read_bytes_total", entry.size)
+
+    @staticmethod
+    def key_for(url: str, params: Dict[str, Any] | None) -> str:
         key_source = url
         if params:
             items = sorted(params.items())
             key_source += json.dumps(items, sort_keys=True)
-        digest = hashlib.sha1(key_source.encode()).hexdigest()
-        return self.cache_dir / f"{digest}.json"
+        return hashlib.sha1(key_source.encode()).hexdigest()
 
-    async def get(self, url: str, params: Dict[str, Any] | None) -> Dict[str, Any] | None:
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return self.ttl is None or time.time() - entry.fetched_at < self.ttl
+
+    async def lookup(self, url: str, params: Dict[str, Any] | None) -> CacheEntry | None:
         if not self.enabled:
             return None
-        path = self._path_for(url, params)
-        if not path.exists():
-            return None
-        async with self.lock:
-            try:
-                return json.loads(path.read_text())
-            except json.JSONDecodeError:
-                return None
+        entry = await asyncio.to_thread(self.backend.read, self.key_for(url, params))
+        self._count_lookup(entry)
+        return entry
 
-    async def set(self, url: str, params: Dict[str, Any] | None, payload: Dict[str, Any]) -> None:
+    async def store(self, url: str, params: Dict[str, Any] | None, entry: CacheEntry) -> None:
+        if not self.enabled:
+            return
+        written = await asyncio.to_thread(self.backend.write, self.key_for(url, params), entry)
+        self.metrics.inc("cache_writes_total")
+        self.metrics.inc("cache_written_bytes_total", written or 0)
+
+    async def delete(self, url: str, params: Dict[str, Any] | None) -> None:
         if not self.enabled:
             return
-        path = self._path_for(url, params)
-        async with self.lock:
-            path.write_text(json.dumps(payload))
+        await asyncio.to_thread(self.backend.delete, self.key_for(url, params))
+
+    async def get(self, url: str, params: Dict[str, Any] | None) -> Dict[str, Any] | None:
+        entry = await self.lookup(url, params)
+        if entry is None or entry.kind != "json":
+            return None
+        return entry.body
+
+    async def set(self, url: str, params: Dict[str, Any] | None, payload: Dict[str, Any]) -> None:
+        await self.store(url, params, CacheEntry(kind="json", body=payload, fetched_at=time.time()))
+
+    def close(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
+
+
+# (initial requests/sec, ceiling requests/sec) per upstream host. Rates adapt
+# between MIN_RATE and the ceiling as responses come back.
+HOST_RATE_LIMITS: Dict[str, tuple[float, float]] = {
+    "www.carqueryapi.com": (5.0, 20.0),
+    "vpic.nhtsa.dot.gov": (10.0, 50.0),
+    "www.fueleconomy.gov": (10.0, 50.0),
+}
+DEFAULT_RATE_LIMIT = (5.0, 20.0)
+MIN_RATE = 0.5
+THROTTLE_STATUSES = {429, 503}
+DEFAULT_THROTTLE_SECONDS = 1.0
+# Completed responses kept per client so a repeated request within a run is
+# answered without a cache or network round trip; least recently used go first.
+RESPONSE_MEMO_SIZE = 256
+
+
+def _retry_after_seconds(value: Optional[str]) -> float:
+    if not value:
+        return DEFAULT_THROTTLE_SECONDS
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return DEFAULT_THROTTLE_SECONDS
+    return max(0.0, when.timestamp() - time.time())
+
+
+def request_labels(url: str, params: Dict[str, Any] | None) -> tuple[str, str]:
+    """(host, endpoint) metric labels without per-make/year cardinality.
+
+    CarQuery multiplexes on `cmd`; vPIC puts arguments in the path after a
+    CamelCase operation name; DOE endpoints are the last path segment.
+    """
+    parsed = httpx.URL(url)
+    if params and "cmd" in params:
+        return parsed.host, str(params["cmd"])
+    segments = [segment for segment in parsed.path.split("/") if segment]
+    for segment in segments:
+        if segment != segment.lower():
+            return parsed.host, segment
+    return parsed.host, segments[-1] if segments else "/"
+
+
+class HostLimiter:
+    """Token bucket plus AIMD concurrency window for a single upstream host."""
+
+    def __init__(self, *, rate: float, max_rate: float, max_concurrency: int) -> None:
+        self.rate = rate
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+    def _take_token(self) -> float:
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        burst = max(1.0, self.rate)
+        self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.concurrency))
+            self.in_flight += 1
+        try:
+            while True:
+                delay = self._take_token()
+                if delay <= 0:
+                    return
+                await asyncio.sleep(delay)
+        except BaseException:
+            await self.release(None)
+            raise
+
+    async def release(self, response: Optional[httpx.Response]) -> None:
+        async with self.condition:
+            self.in_flight -= 1
+            if response is not None and response.status_code in THROTTLE_STATUSES:
+                # Multiplicative decrease, and stop issuing until Retry-After passes.
+                self.rate = max(MIN_RATE, self.rate / 2)
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self.tokens = 0.0
+                pause = _retry_after_seconds(response.headers.get("Retry-After"))
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            elif response is not None and response.status_code < 500:
+                # Additive increase: roughly +1 req/s and +1 slot per window of successes.
+                self.rate = min(self.max_rate, self.rate + 1.0 / self.rate)
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 1.0 / self.concurrency)
+            self.condition.notify_all()
+
+
+class RateLimiter:
+    def __init__(self, *, max_concurrency: int, limits: Dict[str, tuple[float, float]] | None = None) -> None:
+        self.max_concurrency = max_concurrency
+        self.limits = HOST_RATE_LIMITS if limits is None else limits
+        self.hosts: Dict[str, HostLimiter] = {}
+
+    def for_url(self, url: str) -> HostLimiter:
+        host = httpx.URL(url).host
+        limiter = self.hosts.get(host)
+        if limiter is None:
+            rate, max_rate = self.limits.get(host, DEFAULT_RATE_LIMIT)
+            limiter = HostLimiter(rate=rate, max_rate=max_rate, max_concurrency=self.max_concurrency)
+            self.hosts[host] = limiter
+        return limiter
+
+
+class OfflineMiss(RuntimeError):
+    """Raised in offline mode when a request has no recorded response in the fixture bundle."""
 
 
 class HTTPClient:
-    def __init__(self, *, timeout: float, cache: HTTPCache, max_connections: int = 8) -> None:
+    """Async GET client with caching, retries, per-host rate limiting and coalescing.
+
+    Identical requests share one fetch while it is in flight, and the last
+    `memo_size` completed responses answer repeats of the same request for
+    the rest of the client's life (one sync run).
+
+    With `fixtures` set the client either replays from that bundle
+    (`offline=True`: no network, OfflineMiss on any unrecorded request) or
+    records every response it returns into it, cache hits included.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float,
+        cache: HTTPCache,
+        max_connections: int = 8,
+        rate_limiter: RateLimiter | None = None,
+        fixtures: HTTPCache | None = None,
+        offline: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
+        metrics: Metrics | None = None,
+        memo_size: int = RESPONSE_MEMO_SIZE,
+    ) -> None:
+        if offline and fixtures is None:
+            raise ValueError("Offline mode needs a fixture bundle")
         limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
             "Accept": "application/json, text/plain, */*",
             "Referer": "https://www.carqueryapi.com/",
         }
-        self.client = httpx.AsyncClient(timeout=timeout, limits=limits, headers=headers)
+        self.client = httpx.AsyncClient(timeout=timeout, limits=limits, headers=headers, transport=transport)
         self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter(max_concurrency=max_connections)
+        self.in_flight: Dict[tuple[str, str, str], asyncio.Future[Any]] = {}
+        self.completed: OrderedDict[tuple[str, str, str], Any] = OrderedDict()
+        self.memo_size = memo_size
+        self.network_requests = 0
+        self.coalesced_requests = 0
+        self.fixtures = fixtures
+        self.offline = offline
+        self.metrics = metrics or Metrics()
 
-    async def get_json(self, url: str, params: Dict[str, Any] | None = None) -> Dict[str, Any]:
-        cached = await self.cache.get(url, params)
-        if cached is not None:
-            return cached
+    async def _get(
+        self,
+        url: str,
+        params: Dict[str, Any] | None,
+        headers: Dict[str, str] | None = None,
+    ) -> httpx.Response:
+        # Only real network requests are charged against the host's bucket.
+        limiter = self.rate_limiter.for_url(url)
+        host, endpoint = request_labels(url, params)
+        with self.metrics.timer("http_rate_limit_wait_seconds", host=host):
+            await limiter.acquire()
+        self.network_requests += 1
+        response: Optional[httpx.Response] = None
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(url, params=params, headers=headers)
+        finally:
+            status = str(response.status_code) if response is not None else "error"
+            self.metrics.inc("http_requests_total", host=host, endpoint=endpoint, status=status)
+            self.metrics.observe("http_request_seconds", time.perf_counter() - started, host=host, endpoint=endpoint)
+            await limiter.release(response)
+        return response
+
+    async def _fetch(self, url: str, params: Dict[str, Any] | None, kind: str) -> Any:
+        if self.offline:
+            entry = await self.fixtures.lookup(url, params)
+            if entry is None or entry.kind != kind:
+                raise OfflineMiss(f"No recorded {kind} response for GET {url} params={params}")
+            return entry.body
+        body = await self._fetch_live(url, params, kind)
+        if self.fixtures is not None:
+            await self.fixtures.store(url, params, CacheEntry(kind=kind, body=body, fetched_at=time.time()))
+        return body
+
+    async def _fetch_live(self, url: str, params: Dict[str, Any] | None, kind: str) -> Any:
+        entry = await self.cache.lookup(url, params)
+        if entry is not None and entry.kind != kind:
+            entry = None
+        if entry is not None and self.cache.is_fresh(entry):
+            return entry.body
+        # Stale entries are revalidated; a 304 refreshes them without a body.
+        headers = entry.validators() if entry is not None else None
 
         async for attempt in AsyncRetrying(
             stop=stop_after_attempt(3),
@@ -68,33 +312,120 @@ class HTTPClient:
             retry=retry_if_exception_type(httpx.HTTPError),
         ):
             with attempt:
-                response = await self.client.get(url, params=params)
+                if attempt.retry_state.attempt_number > 1:
+                    self.metrics.inc("http_retries_total", host=request_labels(url, params)[0])
+                response = await self._get(url, params, headers)
+                if response.status_code == 304 and entry is not None:
+                    entry.fetched_at = time.time()
+                    await self.cache.store(url, params, entry)
+                    return entry.body
                 if response.status_code == 404:
-                    return {}
+                    return {} if kind == "json" else ""
                 response.raise_for_status()
-                data = response.json()
-                await self.cache.set(url, params, data)
-                return data
+                body = codec.loads(response.content) if kind == "json" else response.text
+                await self.cache.store(
+                    url,
+                    params,
+                    CacheEntry(
+                        kind=kind,
+                        body=body,
+                        fetched_at=time.time(),
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                    ),
+                )
+                return body
         raise RuntimeError("Unreachable")
 
+    def _settle(self, key: tuple[str, str, str], task: asyncio.Future[Any]) -> None:
+        self.in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or self.memo_size <= 0:
+            return
+        self.completed[key] = task.result()
+        self.completed.move_to_end(key)
+        if len(self.completed) > self.memo_size:
+            self.completed.popitem(last=False)
+
+    async def _single_flight(self, url: str, params: Dict[str, Any] | None, kind: str) -> Any:
+        # Identical requests already in flight share one fetch, and repeats of
+        # a completed one reuse its response, instead of each hitting the
+        # cache and the network.
+        key = ("GET", kind, HTTPCache.key_for(url, params))
+        if key in self.completed:
+            self.completed.move_to_end(key)
+            self.coalesced_requests += 1
+            self.metrics.inc("http_coalesced_total", host=request_labels(url, params)[0])
+            return self.completed[key]
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.coalesced_requests += 1
+            self.metrics.inc("http_coalesced_total", host=request_labels(url, params)[0])
+        else:
+            task = asyncio.ensure_future(self._fetch(url, params, kind))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._settle(key, done))
+        # Shield so one cancelled caller does not cancel the fetch for the others.
+        return await asyncio.shield(task)
+
+    async def get_json(self, url: str, params: Dict[str, Any] | None = None) -> Dict[str, Any]:
+        return await self._single_flight(url, params, "json")
+
     async def get_text(self, url: str, params: Dict[str, Any] | None = None) -> str:
-        async for attempt in AsyncRetrying(
-            stop=stop_after_attempt(3),
-            wait=wait_exponential_jitter(initial=0.25, max=3.0),
-            retry=retry_if_exception_type(httpx.HTTPError),
-        ):
-            with attempt:
-                response = await self.client.get(url, params=params)
-                if response.status_code == 404:
-                    return ""
-                response.raise_for_status()
-                return response.text
-        raise RuntimeError("Unreachable")
+        return await self._single_flight(url, params, "text")
+
+    async def invalidate(self, url: str, params: Dict[str, Any] | None = None) -> None:
+        """Drop a cached response, e.g. one whose body turned out to be an error payload."""
+        cache_key = HTTPCache.key_for(url, params)
+        for kind in ("json", "text"):
+            self.completed.pop(("GET", kind, cache_key), None)
+        await self.cache.delete(url, params)
 
     async def aclose(self) -> None:
+        # Shielded fetches outlive their callers; after a failed or cancelled
+        # run some may still be pending. Stop them before closing the
+        # transport they use.
+        pending = list(self.in_flight.values())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
         await self.client.aclose()
+        self.cache.close()
+        if self.fixtures is not None:
+            self.fixtures.close()
+
 
+async def create_client(
+    timeout: float,
+    cache_dir: str,
+    use_cache: bool,
+    max_connections: int = 8,
+    cache_ttl: Optional[float] = None,
+    cache_backend: str = "file",
+    cache_max_bytes: Optional[int] = None,
+    fixtures_dir: Optional[str] = None,
+    offline: bool = False,
+    transport: httpx.AsyncBaseTransport | None = None,
+    rate_limits: Dict[str, tuple[float, float]] | None = None,
+    metrics: Metrics | None = None,
+) -> HTTPClient:
+    """Build the sync client; `fixtures_dir` with `offline` replays, without it records.
 
-async def create_client(timeout: float, cache_dir: str, use_cache: bool) -> HTTPClient:
-    cache = HTTPCache(cache_dir, enabled=use_cache)
-    return HTTPClient(timeout=timeout, cache=cache)
+    `transport` and `rate_limits` let benchmarks and tests point the client at
+    stub upstreams without the production per-host limits.
+    """
+    # Offline runs never read or write the regular cache: the bundle is the only source.
+    enabled = use_cache and not offline
+    backend = create_backend(cache_backend, cache_dir, max_bytes=cache_max_bytes) if enabled else None
+    metrics = metrics or Metrics()
+    cache = HTTPCache(cache_dir, enabled=enabled, ttl=cache_ttl, backend=backend, metrics=metrics)
+    fixtures = HTTPCache(fixtures_dir) if fixtures_dir else None
+    return HTTPClient(
+        timeout=timeout,
+        cache=cache,
+        max_connections=max_connections,
+        rate_limiter=RateLimiter(max_concurrency=max_connections, limits=rate_limits),
+        fixtures=fixtures,
+        offline=offline,
+        transport=transport,
+        metrics=metrics,
+    )
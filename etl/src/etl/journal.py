@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import datetime as dt
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class JournalMismatch(RuntimeError):
+    """Raised when --resume points at a journal written for different run options."""
+
+
+class SyncJournal:
+    """Append-only JSON-lines record of a sync's progress, used by --resume.
+
+    The first line describes the run (year range, filters, dry-run). A `make`
+    line is appended once a make/year slice has been fetched and its makes and
+    models written; it carries the slice's anomalies, stats and the trim rows
+    still waiting for the year merge. A `year` line is appended once the
+    year's trims are merged and flushed. Every line is fsynced, so a crash
+    loses at most the slice in progress. The journal is removed after a
+    successful run.
+    """
+
+    def __init__(self, path: Optional[Path], run: Dict[str, Any]) -> None:
+        self.path = path
+        self.run = run
+        self.makes: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self.years: Dict[int, Dict[str, Any]] = {}
+        self.handle = None
+
+    @classmethod
+    def open(cls, path: Path, run: Dict[str, Any], *, resume: bool) -> "SyncJournal":
+        journal = cls(path, run)
+        lines = []
+        if resume:
+            try:
+                lines = path.read_text().splitlines()
+            except OSError:
+                lines = []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn final line from a crash mid-write; everything before it is intact.
+                break
+        if entries:
+            if entries[0].get("run") != run:
+                raise JournalMismatch(f"{path} was written for {entries[0].get('run')}, not {run}")
+            for entry in entries[1:]:
+                if entry["kind"] == "make":
+                    journal.makes[(entry["year"], entry["make"])] = entry
+                elif entry["kind"] == "year":
+                    journal.years[entry["year"]] = entry
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if entries:
+            journal.handle = path.open("a")
+        else:
+            journal.handle = path.open("w")
+            journal._append({"kind": "run", "run": run})
+        return journal
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        if self.handle is None:
+            return
+        self.handle.write(json.dumps(entry, default=_json_default) + "\n")
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+
+    def completed_make(self, year: int, normalized_make: str) -> Optional[Dict[str, Any]]:
+        return self.makes.get((year, normalized_make))
+
+    def completed_year(self, year: int) -> Optional[Dict[str, Any]]:
+        return self.years.get(year)
+
+    def record_make(
+        self,
+        year: int,
+        normalized_make: str,
+        *,
+        anomalies: List[Dict[str, str]],
+        stats: Dict[str, int],
+        trim_rows: List[tuple[Dict[str, Any], Dict[str, Any]]],
+        fingerprints: Dict[Tuple[str, str, int], str],
+    ) -> None:
+        entry = {
+            "kind": "make",
+            "year": year,
+            "make": normalized_make,
+            "anomalies": anomalies,
+            "stats": stats,
+            "trim_rows": [[row, payload] for row, payload in trim_rows],
+            "fingerprints": [[*key, fingerprint] for key, fingerprint in fingerprints.items()],
+        }
+        self._append(entry)
+
+    def record_year(self, year: int, *, anomalies: List[Dict[str, str]], stats: Dict[str, int]) -> None:
+        entry = {"kind": "year", "year": year, "anomalies": anomalies, "stats": stats}
+        self._append(entry)
+
+    def close(self, *, completed: bool) -> None:
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        if completed and self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+def restore_trim_rows(entry: Dict[str, Any]) -> List[tuple[Dict[str, Any], Dict[str, Any]]]:
+    rows = []
+    for row, payload in entry["trim_rows"]:
+        row = dict(row)
+        if row.get("last_verified_at"):
+            row["last_verified_at"] = dt.datetime.fromisoformat(row["last_verified_at"])
+        rows.append((row, payload))
+    return rows
+
+
+def restore_fingerprints(entry: Dict[str, Any]) -> Dict[Tuple[str, str, int], str]:
+    return {(source, make, year): fingerprint for source, make, year, fingerprint in entry["fingerprints"]}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from .normalize import collapse_spaces, normalize_column, normalized_key
+
+NGRAM = 3
+# Scores at or above this are reported as likely aliases rather than missing models.
+ALIAS_THRESHOLD = 0.7
+
+
+@dataclass(frozen=True)
+class Match:
+    key: str
+    name: str
+    score: float
+
+
+def ngrams(key: str, n: int = NGRAM) -> FrozenSet[str]:
+    padded = f" {key} "
+    if len(padded) <= n:
+        return frozenset({padded})
+    return frozenset(padded[i : i + n] for i in range(len(padded) - n + 1))
+
+
+def similarity(key: str, key_grams: FrozenSet[str], other: str, other_grams: FrozenSet[str]) -> float:
+    """Mean of trigram Dice and token containment; 1.0 if equal ignoring spaces.
+
+    Trigram Dice alone rates "model 3" close to "model s"; token containment
+    alone rates "a3" equal to "a3 sportback e tron". Averaging keeps a
+    one-token designator change below ALIAS_THRESHOLD while extra or missing
+    words ("a3 e tron" / "a3 sportback e tron") stay above it.
+    """
+    if key.replace(" ", "") == other.replace(" ", ""):
+        return 1.0
+    dice = 2 * len(key_grams & other_grams) / (len(key_grams) + len(other_grams))
+    tokens, other_tokens = set(key.split()), set(other.split())
+    if not tokens or not other_tokens:
+        return dice
+    containment = len(tokens & other_tokens) / min(len(tokens), len(other_tokens))
+    return (dice + containment) / 2
+
+
+class NameIndex:
+    """Character n-gram index over one source's model names for a make/year.
+
+    Names are keyed by `normalized_key`, so `in` is the exact check the
+    cross-source anomalies always used. `best_match` returns the most
+    similar name, scoring only names that share a trigram with the query
+    (found through an inverted index) instead of comparing against every
+    name.
+    """
+
+    def __init__(self, names: Iterable[Optional[str]] = ()) -> None:
+        collapsed = [name for name in normalize_column(collapse_spaces, names) if name]
+        self.names: Dict[str, str] = {}
+        for name, key in zip(collapsed, normalize_column(normalized_key, collapsed)):
+            self.names.setdefault(key, name)
+        self.keys: List[str] = list(self.names)
+        self.grams: List[FrozenSet[str]] = [ngrams(key) for key in self.keys]
+        self.postings: Dict[str, List[int]] = {}
+        for position, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(position)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.names
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def best_match(self, key: str) -> Optional[Match]:
+        query = ngrams(key)
+        candidates: Set[int] = set()
+        for gram in query:
+            candidates.update(self.postings.get(gram, ()))
+        best: Optional[Match] = None
+        for position in candidates:
+            candidate = self.keys[position]
+            score = similarity(key, query, candidate, self.grams[position])
+            # Ties go to the alphabetically first key so reports are stable.
+            if best is None or score > best.score or (score == best.score and candidate < best.key):
+                best = Match(candidate, self.names[candidate], score)
+        return best
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Seconds; wide enough for cached reads (sub-ms) up to slow upstream calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROMETHEUS_PREFIX = "nmbli_etl_"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (None for +Inf or empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+
+class Metrics:
+    """Run-wide counters and histograms, exported as JSON and a Prometheus textfile.
+
+    Series are keyed by name plus labels. Database listeners fire on
+    AsyncDatabase's worker thread rather than the event loop, so updates take
+    a lock.
+    """
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = self._labels(labels)
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = self._labels(labels)
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def summary(self) -> Dict[str, Any]:
+        counters = {
+            name: [{"labels": dict(labels), "value": value} for labels, value in sorted(series.items())]
+            for name, series in sorted(self.counters.items())
+        }
+        histograms = {
+            name: [
+                {
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                    "p99": histogram.quantile(0.99),
+                }
+                for labels, histogram in sorted(series.items())
+            ]
+            for name, series in sorted(self.histograms.items())
+        }
+        return {"counters": counters, "histograms": histograms}
+
+    def prometheus(self) -> str:
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            metric = PROMETHEUS_PREFIX + name
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        for name, series in sorted(self.histograms.items()):
+            metric = PROMETHEUS_PREFIX + name
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip((*histogram.buckets, float("inf")), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{metric}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: Path, prometheus_path: Path) -> None:
+        _write_atomic(json_path, json.dumps(self.summary(), indent=2) + "\n")
+        _write_atomic(prometheus_path, self.prometheus())
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    # Textfile collectors may read at any moment; never expose a partial file.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text)
+    os.replace(tmp_path, path)
+
+
+_TABLE_RE = re.compile(r"^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|COPY|CREATE\s+\w*\s*TABLE|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|SELECT\b.*?\bFROM)\s+\"?(\w+)", re.IGNORECASE | re.DOTALL)
+
+
+def statement_table(statement: str) -> str:
+    match = _TABLE_RE.match(statement)
+    return match.group(1) if match else "other"
+
+
+def instrument_engine(engine: Engine, metrics: Metrics) -> None:
+    """Count statements and time statements and transactions per table on `engine`."""
+
+    # The start time lives on the statement's execution context, not the
+    # connection: after_cursor_execute never fires for a statement that
+    # raises, so anything kept per connection would outlive it.
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context.metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        table = statement_table(statement)
+        metrics.inc("db_statements_total", table=table)
+        started = getattr(context, "metrics_started", None)
+        if started is not None:
+            metrics.observe("db_statement_seconds", time.perf_counter() - started, table=table)
+        conn.info.setdefault("metrics_tables", set()).add(table)
+
+    @event.listens_for(engine, "begin")
+    def begin(conn) -> None:
+        conn.info["metrics_transaction"] = time.perf_counter()
+        conn.info["metrics_tables"] = set()
+
+    def end(outcome: str):
+        def finish(conn) -> None:
+            started = conn.info.pop("metrics_transaction", None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            # A transaction touching several tables is charged to each of them.
+            for table in conn.info.pop("metrics_tables", set()) or {"other"}:
+                metrics.observe("db_transaction_seconds", elapsed, table=table, outcome=outcome)
+
+        return finish
+
+    event.listen(engine, "commit", end("commit"))
+    event.listen(engine, "rollback", end("rollback"))
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import re
-from typing import Optional
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
 
 MAKE_ALIASES = {
     "mercedes benz": "Mercedes-Benz",
@@ -15,30 +16,41 @@ MAKE_ALIASES = {
     "polestar": "Polestar",
 }
 
-NON_WORD_RE = re.compile(r"[^\w\s]")
 WHITESPACE_RE = re.compile(r"\s+")
 DRIVE_SUFFIX_RE = re.compile(r"\b(awd|fwd|rwd|4wd|4x4)\b", re.IGNORECASE)
+# One pass for the old hyphen -> punctuation -> whitespace passes: every run of
+# non-word characters (punctuation and whitespace alike) becomes one space.
+NON_WORD_RUN_RE = re.compile(r"\W+")
+TRIM_AT_RE = re.compile(r"\b(\d+)(at|mt)\b", re.IGNORECASE)
+
+DRIVE_TOKENS = frozenset({"awd", "fwd", "rwd", "4wd", "4x4"})
+DRIVETRAINS = {"4X4": "4WD", "FOUR-WHEEL DRIVE": "4WD", "FWD": "FWD", "RWD": "RWD", "AWD": "AWD", "4WD": "4WD"}
+AUTOMATIC_CODES = frozenset({"AT", "AUTO", "AUTOMATIC"})
+MANUAL_CODES = frozenset({"MT", "MANUAL"})
+
+# Entries per memoized function. Sync inputs repeat heavily (the same make,
+# model and trim spellings across sources and years) but are bounded by the
+# catalog, so this holds a full run without growing without limit.
+CACHE_SIZE = 65536
 
+T = TypeVar("T")
 
+
+@lru_cache(maxsize=CACHE_SIZE)
 def normalize_text(value: str) -> str:
-    value = value.strip().lower()
-    value = value.replace("-", " ")
-    value = NON_WORD_RE.sub(" ", value)
-    value = WHITESPACE_RE.sub(" ", value)
-    return value.strip()
+    return NON_WORD_RUN_RE.sub(" ", value.lower()).strip()
 
 
-def normalize_make_name(value: str) -> str:
-    key = normalize_text(value)
-    canonical = MAKE_ALIASES.get(key, value.strip())
-    return canonical
+# Keys normalized once up front, so an alias spelled with punctuation still matches.
+_MAKE_ALIAS_KEYS = {normalize_text(alias): canonical for alias, canonical in MAKE_ALIASES.items()}
 
 
-def normalized_key(value: str) -> str:
-    return normalize_text(value)
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_make_name(value: str) -> str:
+    return _MAKE_ALIAS_KEYS.get(normalize_text(value), value.strip())
 
 
-TRIM_AT_RE = re.compile(r"\b(\d+)(at|mt)\b", re.IGNORECASE)
+normalized_key = normalize_text
 
 
 def _replace_transmission(match: re.Match[str]) -> str:
@@ -48,41 +60,77 @@ def _replace_transmission(match: re.Match[str]) -> str:
     return f"{gear} {label}"
 
 
+@lru_cache(maxsize=CACHE_SIZE)
 def clean_trim_name(name: str) -> str:
     text = name.strip()
     text = text.replace("w/", "with ")
     # Remove duplicate drive suffix if present separately
     parts = text.split()
-    drives = {"awd", "fwd", "rwd", "4wd", "4x4"}
-    if parts and parts[-1].lower() in drives:
-        drive_token = parts[-1]
+    if parts and parts[-1].lower() in DRIVE_TOKENS:
         body = " ".join(parts[:-1])
         if DRIVE_SUFFIX_RE.search(body):
             text = body
     text = TRIM_AT_RE.sub(_replace_transmission, text)
-    return re.sub(r"\s+", " ", text).strip()
+    return WHITESPACE_RE.sub(" ", text).strip()
 
 
+@lru_cache(maxsize=CACHE_SIZE)
 def derive_standard_transmission(value: Optional[str]) -> Optional[str]:
     if not value:
         return None
     val = value.strip().upper()
-    if val in {"AT", "AUTO", "AUTOMATIC"}:
+    if val in AUTOMATIC_CODES:
         return "Automatic"
-    if val in {"MT", "MANUAL"}:
+    if val in MANUAL_CODES:
         return "Manual"
     return value
 
 
+@lru_cache(maxsize=CACHE_SIZE)
 def normalize_drivetrain(value: Optional[str]) -> Optional[str]:
     if not value:
         return None
     val = value.strip().upper()
-    mapping = {"4X4": "4WD", "FOUR-WHEEL DRIVE": "4WD", "FWD": "FWD", "RWD": "RWD", "AWD": "AWD", "4WD": "4WD"}
-    return mapping.get(val, val)
+    return DRIVETRAINS.get(val, val)
 
 
+@lru_cache(maxsize=CACHE_SIZE)
 def collapse_spaces(value: Optional[str]) -> Optional[str]:
     if value is None:
         return None
-    return re.sub(r"\s+", " ", value).strip()
+    return WHITESPACE_RE.sub(" ", value).strip()
+
+
+def normalize_column(normalizer: Callable[[Optional[str]], T], values: Iterable[Optional[str]]) -> List[T]:
+    """Apply `normalizer` to a whole column of names, once per distinct value.
+
+    `normalizer` is one of the functions above; the result keeps the input's
+    order and length.
+    """
+    values = list(values)
+    results = {value: normalizer(value) for value in dict.fromkeys(values)}
+    return [results[value] for value in values]
+
+
+MEMOIZED = {
+    "normalize_text": normalize_text,
+    "normalize_make_name": normalize_make_name,
+    "clean_trim_name": clean_trim_name,
+    "derive_standard_transmission": derive_standard_transmission,
+    "normalize_drivetrain": normalize_drivetrain,
+    "collapse_spaces": collapse_spaces,
+}
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hits, misses and size of each memoized normalizer, for run metrics."""
+    stats = {}
+    for name, function in MEMOIZED.items():
+        info = function.cache_info()
+        stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+    return stats
+
+
+def clear_caches() -> None:
+    for function in MEMOIZED.values():
+        function.cache_clear()
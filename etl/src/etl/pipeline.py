@@ -2,31 +2,50 @@ from __future__ import annotations
 
 import asyncio
 import datetime as dt
+import time
 from collections import defaultdict
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Coroutine, Dict, List, Optional, Set
 
+import httpx
 from rich.console import Console
+from sqlalchemy.engine import Connection
 
+from .aliases import AliasMemory, order_attempts
 from .config import Settings
 from .db import (
+    AsyncDatabase,
+    EvidenceBuffer,
+    EvidenceRow,
+    FingerprintKey,
+    IdentityMap,
+    Touched,
+    TrimKey,
     get_engine,
+    load_fingerprints,
+    make_signature,
+    model_signature,
+    payload_fingerprint,
+    save_fingerprints,
     upsert_make,
     upsert_model,
-    upsert_trim,
-    insert_trim_evidence,
-    mark_trims_inactive,
-    get_model_id,
-    get_make_id,
+    merge_year_trims,
+    trim_row,
+    write_evidence,
+    write_touched,
 )
-from .dq import default_report_path, write_report
-from .http import create_client
-from .normalize import normalize_make_name, normalized_key, collapse_spaces
+from .dq import ReportWriter, default_report_path
+from .http import HTTPClient, OfflineMiss, create_client
+from .journal import SyncJournal, restore_fingerprints, restore_trim_rows
+from .metrics import Metrics, instrument_engine
+from .matching import ALIAS_THRESHOLD, NameIndex
+from .normalize import cache_stats, collapse_spaces, normalize_make_name, normalized_key
+from .planner import SourcePlanner
+from .profiling import SyncProfiler
 from .sources import carquery, vpic, doe
 from .sources.carquery import CarQueryError
 
-CARQUERY_PAUSE_SECONDS = 0.05
-
 
 def _dedupe_preserve(sequence: List[str]) -> List[str]:
     seen = set()
@@ -59,25 +78,32 @@ def _model_aliases(name: str) -> List[str]:
     return _dedupe_preserve(variants)
 
 
-async def _fetch_carquery_models(client: HTTPClient, make_candidates: List[str], year: int) -> tuple[List[Dict[str, Any]], Optional[str]]:
+async def _fetch_carquery_models(
+    client: HTTPClient,
+    make_candidates: List[str],
+    year: int,
+    *,
+    memory: AliasMemory,
+    canonical_make: str,
+) -> tuple[List[Dict[str, Any]], Optional[str]]:
+    attempts: List[tuple[str, Optional[str], bool]] = []
     for make in _dedupe_preserve(make_candidates):
+        attempts.extend([(make, None, True), (make, None, False)])
+    failed_makes: Set[str] = set()
+    for make, _, sold_in_us in order_attempts(attempts, memory.preferred(canonical_make)):
+        if make.lower() in failed_makes or memory.is_miss(make, None, sold_in_us, year):
+            continue
         try:
-            models = await carquery.get_models(client, make, year, sold_in_us=True)
-            await asyncio.sleep(CARQUERY_PAUSE_SECONDS)
+            models = await carquery.get_models(client, make, year, sold_in_us=sold_in_us)
         except CarQueryError as exc:
             if "denied" in str(exc).lower():
                 raise
+            failed_makes.add(make.lower())
             continue
-        if not models:
-            try:
-                models = await carquery.get_models(client, make, year, sold_in_us=False)
-                await asyncio.sleep(CARQUERY_PAUSE_SECONDS)
-            except CarQueryError as exc:
-                if "denied" in str(exc).lower():
-                    raise
-                continue
         if models:
+            memory.record_hit(canonical_make, None, make=make, model=None, sold_in_us=sold_in_us)
             return models, make
+        memory.record_miss(make, None, sold_in_us, year)
     return [], None
 
 
@@ -86,7 +112,12 @@ async def _fetch_carquery_trims(
     make_candidates: List[str],
     model_candidates: List[str],
     year: int,
+    *,
+    memory: AliasMemory,
+    canonical_make: str,
+    canonical_model: str,
 ) -> List[carquery.CarQueryTrim]:
+    attempts: List[tuple[str, Optional[str], bool]] = []
     seen: Set[tuple[str, str, bool]] = set()
     for make in _dedupe_preserve(make_candidates):
         for sold_in_us in (True, False):
@@ -95,77 +126,428 @@ async def _fetch_carquery_trims(
                 if key in seen:
                     continue
                 seen.add(key)
-                try:
-                    trims = await carquery.get_trims(client, make, model, year, sold_in_us=sold_in_us)
-                    await asyncio.sleep(CARQUERY_PAUSE_SECONDS)
-                except CarQueryError as exc:
-                    if "denied" in str(exc).lower():
-                        raise
-                    continue
-                if trims:
-                    return trims
+                attempts.append((make, model, sold_in_us))
+    for make, model, sold_in_us in order_attempts(attempts, memory.preferred(canonical_make, canonical_model)):
+        if memory.is_miss(make, model, sold_in_us, year):
+            continue
+        try:
+            trims = await carquery.get_trims(client, make, model, year, sold_in_us=sold_in_us)
+        except CarQueryError as exc:
+            if "denied" in str(exc).lower():
+                raise
+            continue
+        if trims:
+            memory.record_hit(canonical_make, canonical_model, make=make, model=model, sold_in_us=sold_in_us)
+            return trims
+        memory.record_miss(make, model, sold_in_us, year)
     return []
 
 console = Console()
 
+PROMETHEUS_TEXTFILE = "nmbli_etl.prom"
+
 
 class SyncStats:
     def __init__(self) -> None:
         self.makes_upserted = 0
         self.models_upserted = 0
         self.trims_upserted = 0
+        self.slices_unchanged = 0
 
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
 
-async def sync(settings: Settings) -> None:
-    engine = get_engine(settings.database_url)
-    client = await create_client(settings.http_timeout, settings.cache_dir, settings.use_cache)
-    anomalies: List[Dict[str, str]] = []
-    stats = SyncStats()
+    def add(self, counts: Dict[str, int]) -> None:
+        for name, value in counts.items():
+            setattr(self, name, getattr(self, name, 0) + value)
+
+
+@dataclass
+class MakeResult:
+    """What one make/year slice produced: anomalies, trims to merge, fingerprints to record."""
+
+    anomalies: List[Dict[str, str]]
+    trim_rows: List[tuple[Dict[str, Any], Dict[str, Any]]] = field(default_factory=list)
+    fingerprints: Dict[FingerprintKey, str] = field(default_factory=dict)
+    stats: SyncStats = field(default_factory=SyncStats)
+
+
+# (model name, source payload, normalized name, source) and (mapped trim, source key, evidence payload).
+ModelEntry = tuple[str, Dict[str, Any], str, str]
+FetchedTrim = tuple[Dict[str, Any], str, Dict[str, Any]]
+
+
+@dataclass
+class MakeSlice:
+    """One make/year's fetched and mapped source data, on its way to the writer."""
+
+    year: int
+    entry: Dict[str, Any]
+    anomalies: List[Dict[str, str]]
+    models: List[tuple[ModelEntry, List[FetchedTrim]]] = field(default_factory=list)
+
+
+@dataclass
+class YearBatch:
+    """One year in flight: its make entries and the per-make results collected so far."""
+
+    year: int
+    entries: List[Dict[str, Any]]
+    anomalies: List[Dict[str, str]]
+    has_doe_makes: bool = False
+    results: Dict[int, MakeResult] = field(default_factory=dict)
+
+
+class DoeModelIndex:
+    """Run-wide DOE model NameIndexes by (year, normalized make), prefetched per year."""
 
+    def __init__(self, client: HTTPClient) -> None:
+        self.client = client
+        self.indexes: Dict[tuple[int, str], asyncio.Future[NameIndex]] = {}
+        self.failures: Dict[tuple[int, str], Dict[str, str]] = {}
+
+    def _start(self, year: int, entry: Dict[str, Any]) -> Optional[Coroutine[Any, Any, None]]:
+        # Several DOE make spellings can normalize to the same make; only the
+        # first starts a request and the rest await its future.
+        key = (year, entry["normalized"])
+        if key in self.indexes:
+            return None
+        future: asyncio.Future[NameIndex] = asyncio.get_running_loop().create_future()
+        self.indexes[key] = future
+        return self._fetch(year, entry, future)
+
+    async def _fetch(self, year: int, entry: Dict[str, Any], future: asyncio.Future[NameIndex]) -> None:
+        try:
+            doe_models = await doe.get_models(self.client, year, entry["original"])
+        except OfflineMiss:
+            future.cancel()
+            raise
+        except Exception as exc:
+            self.failures[(year, entry["normalized"])] = {
+                "type": "doe_models_fetch_failed",
+                "year": str(year),
+                "make": entry["canonical"],
+                "detail": str(exc),
+            }
+            doe_models = []
+        future.set_result(NameIndex(doe_models))
+
+    def prefetch(self, year: int, entries: List[Dict[str, Any]], group: asyncio.TaskGroup) -> None:
+        for entry in entries:
+            fetch = self._start(year, entry)
+            if fetch is not None:
+                group.create_task(fetch)
+
+    async def get(self, year: int, entry: Dict[str, Any], anomalies: List[Dict[str, str]]) -> NameIndex:
+        fetch = self._start(year, entry)
+        if fetch is not None:
+            await fetch
+        index = await self.indexes[(year, entry["normalized"])]
+        # A failed fetch is reported once, by whichever make reads it first.
+        failure = self.failures.pop((year, entry["normalized"]), None)
+        if failure is not None:
+            anomalies.append(failure)
+        return index
+
+    def release_year(self, year: int) -> None:
+        for key in [key for key in self.indexes if key[0] == year]:
+            del self.indexes[key]
+            self.failures.pop(key, None)
+
+
+@dataclass
+class SyncContext:
+    """Run-wide state shared by every year, make and model task of a sync."""
+
+    settings: Settings
+    engine: Any
+    client: HTTPClient
+    db: Optional[AsyncDatabase] = None
+    stats: SyncStats = field(default_factory=SyncStats)
+    evidence: Optional[EvidenceBuffer] = None
+    identity: IdentityMap = field(default_factory=IdentityMap)
+    aliases: AliasMemory = field(default_factory=AliasMemory)
+    planner: Optional[SourcePlanner] = None
+    fingerprints: Dict[FingerprintKey, str] = field(default_factory=dict)
+    journal: SyncJournal = field(default_factory=lambda: SyncJournal(None, {}))
+    metrics: Metrics = field(default_factory=Metrics)
+    doe_models: Optional[DoeModelIndex] = None
+    report: Optional[ReportWriter] = None
+
+    def __post_init__(self) -> None:
+        if self.doe_models is None:
+            self.doe_models = DoeModelIndex(self.client)
+        if self.db is None and self.engine is not None:
+            self.db = AsyncDatabase(self.engine, pool_size=self.settings.db_pool_size)
+        if self.evidence is None:
+            self.evidence = EvidenceBuffer(flush_size=self.settings.evidence_flush_size)
+
+    async def flush(self, through_year: Optional[int] = None) -> None:
+        self.aliases.save()
+        if self.settings.dry_run:
+            return
+        touched, evidence = self.identity.take_touched(through_year), self.evidence.take()
+        if any(touched) or evidence:
+            with self.metrics.timer("stage_seconds", stage="flush"):
+                await self.db.run(_write_flush, touched, evidence)
+
+
+def _write_flush(conn: Connection, touched: Touched, evidence: List[EvidenceRow]) -> None:
+    write_touched(conn, touched)
+    write_evidence(conn, evidence)
+
+
+async def sync(
+    settings: Settings,
+    *,
+    transport: httpx.AsyncBaseTransport | None = None,
+    rate_limits: Dict[str, tuple[float, float]] | None = None,
+) -> SyncStats:
+    """Run a full sync; `transport`/`rate_limits` swap in stub upstreams for benchmarks."""
+    years = list(range(settings.start_year, settings.end_year + 1))
+    if settings.only_year:
+        years = [settings.only_year]
+    run = {"years": years, "only_make": settings.only_make, "dry_run": settings.dry_run}
+    journal = SyncJournal.open(Path(settings.journal_path), run, resume=settings.resume)
+    started = time.perf_counter()
+    normalize_before = cache_stats()
+    metrics = Metrics()
+    engine = get_engine(settings.database_url)
+    database = AsyncDatabase(engine, pool_size=settings.db_pool_size)
+    instrument_engine(database.sync_engine, metrics)
+    client = await create_client(
+        settings.http_timeout,
+        settings.cache_dir,
+        settings.use_cache,
+        max_connections=settings.max_workers,
+        cache_ttl=settings.cache_ttl_seconds,
+        cache_backend=settings.cache_backend,
+        cache_max_bytes=settings.cache_max_bytes,
+        fixtures_dir=settings.fixtures_dir if settings.offline or settings.record else None,
+        offline=settings.offline,
+        transport=transport,
+        rate_limits=rate_limits,
+        metrics=metrics,
+    )
+    ctx = SyncContext(
+        settings=settings,
+        engine=engine,
+        client=client,
+        db=database,
+        aliases=AliasMemory.load(Path(settings.alias_memory_path), ttl_days=settings.alias_ttl_days),
+        journal=journal,
+        metrics=metrics,
+    )
+    if not settings.dry_run:
+        ctx.identity = await database.run(IdentityMap.load)
+        if settings.incremental:
+            ctx.fingerprints = await database.run(load_fingerprints)
+    ctx.report = ReportWriter(Path(settings.dq_report_path or default_report_path(Path(settings.reports_dir))))
+    stats = ctx.stats
+    profiler: Optional[SyncProfiler] = None
+    if settings.profile:
+        timestamp = dt.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        profiler = SyncProfiler(Path(settings.profile_dir or Path(settings.reports_dir) / "profiles" / timestamp))
+
+    completed = False
     try:
-        years = list(range(settings.start_year, settings.end_year + 1))
-        if settings.only_year:
-            years = [settings.only_year]
+        if settings.bulk_fetch:
+            ctx.planner = SourcePlanner(client, ctx.aliases, min_year=min(years), max_year=max(years))
+        pending: List[int] = []
         for year in years:
-            console.rule(f"Syncing year {year}")
-            year_anomalies = await sync_year(year, settings, engine, client, stats)
-            anomalies.extend(year_anomalies)
+            done = ctx.journal.completed_year(year)
+            if done is not None:
+                console.log(f"Resuming: year {year} already synced")
+                # Years finish in order, so journaled years precede the pending ones.
+                ctx.report.write(done["anomalies"])
+                stats.add(done["stats"])
+            else:
+                pending.append(year)
+        if profiler is None:
+            await sync_years(pending, ctx)
+        else:
+            # cProfile sessions cannot overlap, so profiled years do not stream into each other.
+            for year in pending:
+                async with profiler.year(year):
+                    await sync_years([year], ctx)
+        completed = True
     finally:
-        await client.aclose()
-
-    report_path = settings.dq_report_path
-    if not report_path and anomalies:
-        report_path = str(default_report_path(Path(settings.reports_dir)))
-    if report_path:
-        write_report(Path(report_path), anomalies)
+        try:
+            await ctx.flush()
+        finally:
+            ctx.journal.close(completed=completed)
+            if ctx.planner is not None:
+                await ctx.planner.aclose()
+            await client.aclose()
+            ctx.report.close(completed=completed)
+            # Failed and interrupted runs export too; they are the ones worth diagnosing.
+            _write_metrics(ctx, completed=completed, started=started, normalize_before=normalize_before)
+            await database.dispose()
+
+    if profiler is not None:
+        summary_path = profiler.write_summary()
+        for row in profiler.years:
+            console.log(
+                f"Profile {row['year']}: {row['wall_seconds']}s wall, {row['busy_seconds']}s loop CPU, "
+                f"{row['await_seconds']}s awaiting, {row['loop_lag_total_seconds']}s loop lag "
+                f"(max {row['loop_lag_max_seconds']}s, {row['loop_stalls']} stalls)"
+            )
+        console.log(f"Wrote profiles to {summary_path.parent}")
 
     console.rule("Sync complete")
     console.log(f"Makes upserted: {stats.makes_upserted}")
     console.log(f"Models upserted: {stats.models_upserted}")
     console.log(f"Trims upserted: {stats.trims_upserted}")
+    console.log(f"Unchanged make/year slices skipped: {stats.slices_unchanged}")
+    console.log(f"HTTP requests: {client.network_requests} ({client.coalesced_requests} coalesced)")
+    return stats
+
+
+def _write_metrics(
+    ctx: SyncContext, *, completed: bool, started: float, normalize_before: Dict[str, Dict[str, int]]
+) -> None:
+    settings, metrics = ctx.settings, ctx.metrics
+    metrics.inc("sync_runs_total", status="completed" if completed else "failed")
+    for name, value in ctx.stats.as_dict().items():
+        metrics.inc(f"sync_{name}_total", value)
+    for function, counts in cache_stats().items():
+        before = normalize_before[function]
+        metrics.inc("normalize_cache_hits_total", counts["hits"] - before["hits"], function=function)
+        metrics.inc("normalize_cache_misses_total", counts["misses"] - before["misses"], function=function)
+    metrics.observe("stage_seconds", time.perf_counter() - started, stage="sync")
+    metrics_dir = Path(settings.metrics_dir or settings.reports_dir)
+    timestamp = dt.datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    metrics.write(metrics_dir / f"metrics_{timestamp}.json", metrics_dir / PROMETHEUS_TEXTFILE)
+    console.log(f"Wrote metrics to {metrics_dir}")
+
+
+async def sync_year(year: int, ctx: SyncContext) -> List[Dict[str, str]]:
+    return (await sync_years([year], ctx))[year]
+
+
+async def sync_years(years: List[int], ctx: SyncContext) -> Dict[int, List[Dict[str, str]]]:
+    """Stream `years` through discover -> fetch -> write stages joined by bounded queues."""
+    settings = ctx.settings
+    workers = max(1, settings.max_workers)
+    fetch_queue: asyncio.Queue[Optional[tuple[YearBatch, int]]] = asyncio.Queue(maxsize=workers)
+    write_queue: asyncio.Queue[YearBatch | tuple[YearBatch, int, MakeSlice | MakeResult] | None] = asyncio.Queue(
+        maxsize=workers
+    )
+    year_slots = asyncio.Semaphore(max(1, settings.years_in_flight))
+    model_limit = asyncio.Semaphore(workers)
+    finished: Dict[int, List[Dict[str, str]]] = {}
+
+    async def discover() -> None:
+        for year in years:
+            await year_slots.acquire()
+            console.rule(f"Syncing year {year}")
+            batch = await _discover_year(year, ctx)
+            # The writer learns how many slices to expect before any of them arrive.
+            await _put(write_queue, batch, ctx.metrics, "write")
+            done = [ctx.journal.completed_make(year, entry["normalized"]) for entry in batch.entries]
+            if batch.has_doe_makes:
+                pending = [entry for entry, result in zip(batch.entries, done) if result is None]
+                ctx.doe_models.prefetch(year, pending, group)
+            for index, result in enumerate(done):
+                if result is not None:
+                    # Finished before the last run stopped; its trims still await this year's merge.
+                    await _put(write_queue, (batch, index, _restore_make(result)), ctx.metrics, "write")
+                else:
+                    await _put(fetch_queue, (batch, index), ctx.metrics, "fetch")
+        for _ in range(workers):
+            await fetch_queue.put(None)
+
+    async def fetch() -> None:
+        while (item := await fetch_queue.get()) is not None:
+            batch, index = item
+            fetched = await _fetch_make(
+                batch.entries[index],
+                batch.year,
+                ctx,
+                has_doe_makes=batch.has_doe_makes,
+                model_limit=model_limit,
+            )
+            await _put(write_queue, (batch, index, fetched), ctx.metrics, "write")
+
+    async def finish(batch: YearBatch, previous: Optional[asyncio.Task[None]]) -> None:
+        if previous is not None:
+            await previous
+        anomalies = await _finish_year(batch, ctx)
+        # With a report writer the rows are already on disk; don't hold every year's.
+        finished[batch.year] = anomalies if ctx.report is None else []
+        year_slots.release()
+
+    async def write() -> None:
+        finishing: Optional[asyncio.Task[None]] = None
+        while (item := await write_queue.get()) is not None:
+            if isinstance(item, YearBatch):
+                batch = item
+            else:
+                batch, index, fetched = item
+                if isinstance(fetched, MakeSlice):
+                    result = await _write_make(fetched, ctx)
+                    ctx.journal.record_make(
+                        batch.year,
+                        fetched.entry["normalized"],
+                        anomalies=result.anomalies,
+                        stats=result.stats.as_dict(),
+                        trim_rows=result.trim_rows,
+                        fingerprints=result.fingerprints,
+                    )
+                else:
+                    result = fetched
+                batch.results[index] = result
+            if len(batch.results) == len(batch.entries):
+                # The year merge only writes trims and evidence, so it runs on its
+                # own connection while the writer moves on to the next year's
+                # makes and models; merges still happen in year order.
+                finishing = group.create_task(finish(batch, finishing))
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(discover())
+        group.create_task(write())
+        fetchers = [group.create_task(fetch()) for _ in range(workers)]
+        # A failing stage cancels this body too, so waiting here cannot hang.
+        await asyncio.wait(fetchers)
+        await write_queue.put(None)
+    return finished
+
+
+async def _put(queue: asyncio.Queue[Any], item: Any, metrics: Metrics, name: str) -> None:
+    if not queue.full():
+        queue.put_nowait(item)
+        return
+    # Backpressure: the stage downstream of `name` is behind.
+    with metrics.timer("queue_blocked_seconds", queue=name):
+        await queue.put(item)
+
+
+def _restore_make(entry: Dict[str, Any]) -> MakeResult:
+    stats = SyncStats()
+    stats.add(entry["stats"])
+    return MakeResult(entry["anomalies"], restore_trim_rows(entry), restore_fingerprints(entry), stats)
 
 
-async def sync_year(
-    year: int,
-    settings: Settings,
-    engine,
-    client,
-    stats: SyncStats,
-) -> List[Dict[str, str]]:
+async def _discover_year(year: int, ctx: SyncContext) -> YearBatch:
+    settings = ctx.settings
+    client = ctx.client
     anomalies: List[Dict[str, str]] = []
 
-    try:
-        doe_make_names = await doe.get_makes(client, year)
-    except Exception as exc:
-        console.log(f"[red]DOE makes fetch failed for {year}: {exc}")
-        anomalies.append({"type": "doe_fetch_failed", "year": str(year), "detail": str(exc)})
-        doe_make_names = []
+    with ctx.metrics.timer("stage_seconds", stage="source_makes"):
+        try:
+            doe_make_names = await doe.get_makes(client, year)
+        except OfflineMiss:
+            raise
+        except Exception as exc:
+            console.log(f"[red]DOE makes fetch failed for {year}: {exc}")
+            anomalies.append({"type": "doe_fetch_failed", "year": str(year), "detail": str(exc)})
+            doe_make_names = []
 
-    try:
-        carquery_makes = await carquery.get_makes(client, year)
-    except CarQueryError as exc:
-        console.log(f"[yellow]CarQuery get_makes failed for {year}: {exc}")
-        carquery_makes = []
+        try:
+            carquery_makes = await carquery.get_makes(client, year)
+        except CarQueryError as exc:
+            console.log(f"[yellow]CarQuery get_makes failed for {year}: {exc}")
+            carquery_makes = []
 
     carquery_make_map: Dict[str, Dict[str, Any]] = {}
     for item in carquery_makes:
@@ -209,210 +591,386 @@ async def sync_year(
 
     if not make_entries:
         anomalies.append({"type": "no_makes", "year": str(year)})
-        return anomalies
-
-    doe_models_cache: Dict[str, Set[str]] = {}
-
-    for entry in make_entries:
-        canonical_make = entry["canonical"]
-        normalized_make = entry["normalized"]
-        original_name = entry["original"]
-        cq_item = entry["carquery"]
-
-        make_candidates = []
-        if cq_item:
-            for key in (cq_item.get("make_name"), cq_item.get("make_id"), cq_item.get("make_display")):
-                if key:
-                    make_candidates.append(key)
-        make_candidates.extend([
-            original_name,
-            canonical_make,
-            canonical_make.lower(),
-            canonical_make.replace(" ", "-"),
-            canonical_make.replace("-", " "),
-        ])
-        make_candidates = _dedupe_preserve(make_candidates)
+    return YearBatch(year, make_entries, anomalies, has_doe_makes=bool(doe_make_names))
 
-        try:
-            carquery_models, carquery_make_used = await _fetch_carquery_models(client, make_candidates, year)
-        except CarQueryError as exc:
-            console.log(f"[yellow]CarQuery models denied for {canonical_make} {year}: {exc}")
-            carquery_models, carquery_make_used = [], None
 
-        try:
-            vpic_models = await vpic.get_models_for_make_year(client, canonical_make, year)
-        except Exception as exc:
-            console.log(f"[yellow]VPIC models fetch failed for {canonical_make} {year}: {exc}")
-            vpic_models = []
 
-        vpic_norms = {
-            normalized_key(collapse_spaces(model.get("Model_Name")))
-            for model in vpic_models
-            if collapse_spaces(model.get("Model_Name"))
-        }
+async def _finish_year(batch: YearBatch, ctx: SyncContext) -> List[Dict[str, str]]:
+    """Merge a fully written year's trims, record its fingerprints and journal it."""
+    settings = ctx.settings
+    year = batch.year
+    anomalies = list(batch.anomalies)
+    stats = SyncStats()
+    trim_rows: List[tuple[Dict[str, Any], Dict[str, Any]]] = []
+    fingerprints: Dict[FingerprintKey, str] = {}
+    for index in range(len(batch.entries)):
+        result = batch.results.pop(index)
+        anomalies.extend(result.anomalies)
+        trim_rows.extend(result.trim_rows)
+        fingerprints.update(result.fingerprints)
+        stats.add(result.stats.as_dict())
+
+    def merge(conn: Connection) -> Dict[TrimKey, int]:
+        # The whole year's trims are merged in one transaction so readers never
+        # see a half-applied year; fingerprints commit with it, so a failed year
+        # is rewritten next run.
+        trim_ids = merge_year_trims(conn, year, (row for row, _ in trim_rows))
+        save_fingerprints(conn, fingerprints)
+        return trim_ids
+
+    if (trim_rows or fingerprints) and not settings.dry_run:
+        with ctx.metrics.timer("stage_seconds", stage="trim_merge"):
+            trim_ids = await ctx.db.run(merge)
+        ctx.fingerprints.update(fingerprints)
+        stats.trims_upserted += len(trim_ids)
+        for row, payload in trim_rows:
+            trim_id = trim_ids.get((row["model_id"], year, row["normalized_trim_name"]))
+            if trim_id is not None:
+                ctx.evidence.add(trim_id=trim_id, source="carquery", payload=payload)
+                if ctx.evidence.full:
+                    await ctx.db.run(write_evidence, ctx.evidence.take())
+
+    ctx.stats.add(stats.as_dict())
+    if ctx.planner is not None:
+        ctx.planner.release_year(year)
+    ctx.doe_models.release_year(year)
+    await ctx.flush(through_year=year)
+    ctx.journal.record_year(year, anomalies=anomalies, stats=stats.as_dict())
+    if ctx.report is not None:
+        ctx.report.write(anomalies)
+    return anomalies
 
-        if normalized_make not in doe_models_cache and doe_make_names:
-            try:
-                doe_models = await doe.get_models(client, year, original_name)
-                await asyncio.sleep(CARQUERY_PAUSE_SECONDS)
-            except Exception as exc:
-                anomalies.append(
-                    {
-                        "type": "doe_models_fetch_failed",
-                        "year": str(year),
-                        "make": canonical_make,
-                        "detail": str(exc),
-                    }
-                )
-                doe_models = []
-            doe_models_cache[normalized_make] = {
-                normalized_key(collapse_spaces(item)) for item in doe_models if collapse_spaces(item)
-            }
 
-        doe_model_norms = doe_models_cache.get(normalized_make, set())
+async def _fetch_make(
+    entry: Dict[str, Any],
+    year: int,
+    ctx: SyncContext,
+    *,
+    has_doe_makes: bool,
+    model_limit: asyncio.Semaphore,
+) -> MakeSlice:
+    """Fetch and map one make/year slice; nothing is written here."""
+    client = ctx.client
+    started = time.perf_counter()
+    anomalies: List[Dict[str, str]] = []
+    canonical_make = entry["canonical"]
+    original_name = entry["original"]
+    cq_item = entry["carquery"]
+
+    make_candidates = []
+    if cq_item:
+        for key in (cq_item.get("make_name"), cq_item.get("make_id"), cq_item.get("make_display")):
+            if key:
+                make_candidates.append(key)
+    make_candidates.extend([
+        original_name,
+        canonical_make,
+        canonical_make.lower(),
+        canonical_make.replace(" ", "-"),
+        canonical_make.replace("-", " "),
+    ])
+    make_candidates = _dedupe_preserve(make_candidates)
+
+    planned: Dict[str, tuple[str, List[carquery.CarQueryTrim]]] = {}
+    planned_make = None
+    if ctx.planner is not None:
+        planned_year = await ctx.planner.make_year(canonical_make, make_candidates, year)
+        if planned_year is not None:
+            # The bulk query already covers this make/year: its trims fill in
+            # the listed models instead of per-model probing.
+            planned_make, planned = planned_year
+    try:
+        carquery_models, carquery_make_used = await _fetch_carquery_models(
+            client, make_candidates, year, memory=ctx.aliases, canonical_make=canonical_make
+        )
+    except CarQueryError as exc:
+        console.log(f"[yellow]CarQuery models denied for {canonical_make} {year}: {exc}")
+        carquery_models, carquery_make_used = [], None
+    if not carquery_models and planned:
+        carquery_models = [{"model_name": model_name} for model_name, _ in planned.values()]
+    carquery_make_used = planned_make or carquery_make_used
 
-        if not carquery_models and not vpic_models:
-            anomalies.append({"type": "no_models_for_make", "year": str(year), "make": canonical_make})
-            continue
+    try:
+        vpic_models = await vpic.get_models_for_make_year(client, canonical_make, year)
+    except OfflineMiss:
+        raise
+    except Exception as exc:
+        console.log(f"[yellow]VPIC models fetch failed for {canonical_make} {year}: {exc}")
+        vpic_models = []
+
+    vpic_index = NameIndex(model.get("Model_Name") for model in vpic_models)
+
+    doe_index = NameIndex()
+    if has_doe_makes:
+        with ctx.metrics.timer("stage_seconds", stage="doe_models_wait"):
+            doe_index = await ctx.doe_models.get(year, entry, anomalies)
+
+    if not carquery_models and not vpic_models:
+        anomalies.append({"type": "no_models_for_make", "year": str(year), "make": canonical_make})
+        return MakeSlice(year, entry, anomalies)
+
+    model_entries: List[ModelEntry] = []
+    seen_models: Set[str] = set()
+    if carquery_models:
+        for model_item in carquery_models:
+            model_name = collapse_spaces(
+                model_item.get("model_name")
+                or model_item.get("model_display")
+                or model_item.get("model_trim")
+            )
+            if not model_name:
+                continue
+            normalized_model = normalized_key(model_name)
+            if normalized_model in seen_models:
+                continue
+            seen_models.add(normalized_model)
+            model_entries.append((model_name, model_item, normalized_model, "carquery"))
+    else:
+        for model_item in vpic_models:
+            model_name = collapse_spaces(model_item.get("Model_Name"))
+            if not model_name:
+                continue
+            normalized_model = normalized_key(model_name)
+            if normalized_model in seen_models:
+                continue
+            seen_models.add(normalized_model)
+            model_entries.append((model_name, model_item, normalized_model, "vpic"))
+
+    if not model_entries:
+        anomalies.append({"type": "no_models_for_make", "year": str(year), "make": canonical_make})
+        return MakeSlice(year, entry, anomalies)
+
+    make_for_trims = make_candidates
+    if carquery_make_used:
+        make_for_trims = [carquery_make_used] + make_for_trims
+
+    async def run_model(model_entry: ModelEntry) -> tuple[List[Dict[str, str]], List[FetchedTrim]]:
+        async with model_limit:
+            return await _fetch_model(
+                model_entry,
+                year,
+                ctx,
+                canonical_make=canonical_make,
+                make_for_trims=make_for_trims,
+                planned_trims=planned.get(model_entry[2], (None, None))[1],
+                vpic_index=vpic_index,
+                doe_index=doe_index,
+            )
+
+    async with asyncio.TaskGroup() as group:
+        tasks = [group.create_task(run_model(model_entry)) for model_entry in model_entries]
+
+    fetched: List[tuple[ModelEntry, List[FetchedTrim]]] = []
+    for model_entry, task in zip(model_entries, tasks):
+        model_anomalies, model_trims = task.result()
+        anomalies.extend(model_anomalies)
+        fetched.append((model_entry, model_trims))
+
+    ctx.metrics.observe("stage_seconds", time.perf_counter() - started, stage="make_fetch")
+    return MakeSlice(year, entry, anomalies, fetched)
 
-        make_source = "carquery" if cq_item else "doe"
-        make_id: Optional[int] = None
-        if not settings.dry_run:
-            existing_make_id = get_make_id(engine, normalized_make)
-            make_id = upsert_make(
-                engine,
+
+async def _write_make(fetched_make: MakeSlice, ctx: SyncContext) -> MakeResult:
+    """Write a fetched slice's make and models (trims wait for the year merge) unless unchanged."""
+    settings = ctx.settings
+    year, anomalies, fetched = fetched_make.year, fetched_make.anomalies, fetched_make.models
+    if settings.dry_run or not fetched:
+        return MakeResult(anomalies)
+    stats = SyncStats()
+    started = time.perf_counter()
+    canonical_make = fetched_make.entry["canonical"]
+    normalized_make = fetched_make.entry["normalized"]
+    cq_item = fetched_make.entry["carquery"]
+
+    make_source = "carquery" if cq_item else "doe"
+    make_source_key = cq_item.get("make_id") if cq_item else canonical_make
+    make_sig = make_signature(canonical_make, make_source, make_source_key, "US")
+    model_sigs = [
+        model_signature(model_name, source, _model_source_key(model_payload, source))
+        for model_name, model_payload, _, source in (model_entry for model_entry, _ in fetched)
+    ]
+    slice_key = (fetched[0][0][3], normalized_make, year)
+    fingerprint = payload_fingerprint(
+        {
+            "make": make_sig,
+            "models": [
+                [normalized_model, model_sig, [[trim_key, mapped] for mapped, trim_key, _ in model_trims]]
+                for ((_, _, normalized_model, _), model_trims), model_sig in zip(fetched, model_sigs)
+            ],
+        }
+    )
+    if settings.incremental and ctx.fingerprints.get(slice_key) == fingerprint:
+        model_ids = _known_model_ids(ctx.identity, normalized_make, [entry[2] for entry, _ in fetched])
+        if model_ids is not None:
+            # Same upstream data as the last successful write: nothing to upsert.
+            stats.slices_unchanged += 1
+            if settings.touch_unchanged:
+                ctx.identity.touch_make(ctx.identity.makes[normalized_make][0])
+                for model_id in model_ids:
+                    ctx.identity.touch_model(model_id)
+                ctx.identity.touch_trims(year, model_ids)
+            ctx.metrics.observe("stage_seconds", time.perf_counter() - started, stage="make_write")
+            return MakeResult(anomalies, stats=stats)
+
+    # Decide from the identity map what needs writing, then issue every upsert
+    # for the slice in one awaited transaction.
+    make_id, make_unchanged = ctx.identity.make_id(normalized_make, make_sig)
+    model_states = [
+        ctx.identity.model_id(make_id, model_entry[2], model_sig, year) if make_id is not None else (None, False)
+        for (model_entry, _), model_sig in zip(fetched, model_sigs)
+    ]
+
+    def write(conn: Connection) -> tuple[int, Dict[str, int]]:
+        written_make_id = make_id
+        if not make_unchanged:
+            written_make_id = upsert_make(
+                conn,
                 name=canonical_make,
                 normalized_name=normalized_make,
                 source=make_source,
-                source_key=(cq_item.get("make_id") if cq_item else canonical_make),
+                source_key=make_source_key,
                 country="US",
             )
-            if existing_make_id is None:
-                stats.makes_upserted += 1
-
-        model_entries: List[tuple[str, Dict[str, Any], str, str]] = []
-        seen_models: Set[str] = set()
-        if carquery_models:
-            for model_item in carquery_models:
-                model_name = collapse_spaces(
-                    model_item.get("model_name")
-                    or model_item.get("model_display")
-                    or model_item.get("model_trim")
-                )
-                if not model_name:
-                    continue
-                normalized_model = normalized_key(model_name)
-                if normalized_model in seen_models:
-                    continue
-                seen_models.add(normalized_model)
-                model_entries.append((model_name, model_item, normalized_model, "carquery"))
-        else:
-            for model_item in vpic_models:
-                model_name = collapse_spaces(model_item.get("Model_Name"))
-                if not model_name:
-                    continue
-                normalized_model = normalized_key(model_name)
-                if normalized_model in seen_models:
-                    continue
-                seen_models.add(normalized_model)
-                model_entries.append((model_name, model_item, normalized_model, "vpic"))
-
-        if not model_entries:
-            anomalies.append({"type": "no_models_for_make", "year": str(year), "make": canonical_make})
-            continue
-
-        for model_name, model_payload, normalized_model, source in model_entries:
-            model_id: Optional[int] = None
-            if not settings.dry_run and make_id is not None:
-                existing_model_id = get_model_id(engine, make_id, normalized_model)
-                model_id = upsert_model(
-                    engine,
-                    make_id=make_id,
+        model_ids: Dict[str, int] = {}
+        for ((model_name, model_payload, normalized_model, source), _), (_, unchanged) in zip(fetched, model_states):
+            if not unchanged:
+                model_ids[normalized_model] = upsert_model(
+                    conn,
+                    make_id=written_make_id,
                     name=model_name,
                     normalized_name=normalized_model,
                     source=source,
-                    source_key=(
-                        model_payload.get("model_id")
-                        if source == "carquery"
-                        else model_payload.get("Model_ID")
-                    ),
+                    source_key=_model_source_key(model_payload, source),
                     first_year=year,
                     last_year=year,
                 )
-                if existing_model_id is None:
-                    stats.models_upserted += 1
-
-            if vpic_norms and normalized_model not in vpic_norms:
-                anomalies.append(
-                    {
-                        "type": "model_missing_vpic",
-                        "year": str(year),
-                        "make": canonical_make,
-                        "model": model_name,
-                    }
-                )
-            if doe_model_norms and normalized_model not in doe_model_norms:
-                anomalies.append(
-                    {
-                        "type": "model_missing_doe",
-                        "year": str(year),
-                        "make": canonical_make,
-                        "model": model_name,
-                    }
-                )
+        return written_make_id, model_ids
+
+    written_model_ids: Dict[str, int] = {}
+    if not make_unchanged or not all(unchanged for _, unchanged in model_states):
+        written_make_id, written_model_ids = await ctx.db.run(write)
+    if make_unchanged:
+        ctx.identity.touch_make(make_id)
+    else:
+        if make_id is None:
+            stats.makes_upserted += 1
+        make_id = written_make_id
+        ctx.identity.remember_make(normalized_make, make_id, make_sig)
+
+    trim_rows: List[tuple[Dict[str, Any], Dict[str, Any]]] = []
+    for ((_, _, normalized_model, _), model_trims), model_sig, (model_id, unchanged) in zip(fetched, model_sigs, model_states):
+        if unchanged:
+            ctx.identity.touch_model(model_id)
+        else:
+            if model_id is None:
+                stats.models_upserted += 1
+            model_id = written_model_ids[normalized_model]
+            ctx.identity.remember_model(make_id, normalized_model, model_id, model_sig, year)
+        for mapped, trim_key, trim_payload in model_trims:
+            row = trim_row(
+                model_id=model_id,
+                year=year,
+                trim_name=mapped["trim_name"],
+                normalized_trim_name=mapped["normalized_trim_name"],
+                attributes=mapped["attributes"],
+                source="carquery",
+                source_key=trim_key,
+            )
+            trim_rows.append((row, trim_payload))
+    ctx.metrics.observe("stage_seconds", time.perf_counter() - started, stage="make_write")
+    return MakeResult(anomalies, trim_rows, {slice_key: fingerprint}, stats)
+
+
+def _model_source_key(model_payload: Dict[str, Any], source: str) -> Any:
+    return model_payload.get("model_id") if source == "carquery" else model_payload.get("Model_ID")
+
+
+def _known_model_ids(identity: IdentityMap, normalized_make: str, normalized_models: List[str]) -> Optional[List[int]]:
+    """Ids of an already-written slice, or None if the identity map is missing any of them."""
+    known_make = identity.makes.get(normalized_make)
+    if known_make is None:
+        return None
+    model_ids = []
+    for normalized_model in normalized_models:
+        known_model = identity.models.get((known_make[0], normalized_model))
+        if known_model is None:
+            return None
+        model_ids.append(known_model[0])
+    return model_ids
+
+
+def _missing_model_anomaly(
+    source: str, year: int, canonical_make: str, model_name: str, normalized_model: str, index: NameIndex
+) -> Dict[str, str]:
+    """`model_missing_<source>` (or `model_alias_<source>`) carrying the closest listed name."""
+    anomaly = {"type": f"model_missing_{source}", "year": str(year), "make": canonical_make, "model": model_name}
+    match = index.best_match(normalized_model)
+    if match is not None:
+        anomaly["best_match"] = match.name
+        anomaly["match_score"] = f"{match.score:.2f}"
+        if match.score >= ALIAS_THRESHOLD:
+            anomaly["type"] = f"model_alias_{source}"
+    return anomaly
+
+
+async def _fetch_model(
+    model_entry: ModelEntry,
+    year: int,
+    ctx: SyncContext,
+    *,
+    canonical_make: str,
+    make_for_trims: List[str],
+    planned_trims: Optional[List[carquery.CarQueryTrim]],
+    vpic_index: NameIndex,
+    doe_index: NameIndex,
+) -> tuple[List[Dict[str, str]], List[FetchedTrim]]:
+    """Fetch one model's trims; returns anomalies and (mapped trim, source key, evidence) triples."""
+    client = ctx.client
+    anomalies: List[Dict[str, str]] = []
+    trims: List[FetchedTrim] = []
+    model_name, _, normalized_model, _ = model_entry
 
-            make_for_trims = make_candidates
-            if carquery_make_used:
-                make_for_trims = [carquery_make_used] + make_for_trims
-
-            model_variants = _model_aliases(model_name)
-            try:
-                trims_data = await _fetch_carquery_trims(client, make_for_trims, model_variants, year)
-            except CarQueryError as exc:
-                console.log(f"[yellow]CarQuery trims denied for {canonical_make} {model_name} {year}: {exc}")
-                trims_data = []
-
-            if not trims_data:
-                anomalies.append(
-                    {
-                        "type": "no_trims",
-                        "year": str(year),
-                        "make": canonical_make,
-                        "model": model_name,
-                    }
-                )
-                continue
+    for source, index in (("vpic", vpic_index), ("doe", doe_index)):
+        if index and normalized_model not in index:
+            anomalies.append(_missing_model_anomaly(source, year, canonical_make, model_name, normalized_model, index))
 
-            active_trims: List[str] = []
-            seen_trims: Set[str] = set()
-            for trim_entry in trims_data:
-                mapped = carquery.map_trim(trim_entry)
-                normalized_trim = mapped["normalized_trim_name"]
-                if not normalized_trim or normalized_trim in seen_trims:
-                    continue
-                seen_trims.add(normalized_trim)
-                active_trims.append(normalized_trim)
-                if settings.dry_run or model_id is None:
-                    continue
-                trim_id = upsert_trim(
-                    engine,
-                    model_id=model_id,
-                    year=year,
-                    trim_name=mapped["trim_name"],
-                    normalized_trim_name=normalized_trim,
-                    attributes=mapped["attributes"],
-                    source="carquery",
-                    source_key=f"{trim_entry.model_year}:{trim_entry.model_trim or trim_entry.model_name}",
-                )
-                stats.trims_upserted += 1
-                insert_trim_evidence(
-                    engine,
-                    trim_id=trim_id,
-                    source="carquery",
-                    payload=trim_entry.model_dump(),
-                )
+    if planned_trims:
+        trims_data = planned_trims
+    else:
+        model_variants = _model_aliases(model_name)
+        try:
+            trims_data = await _fetch_carquery_trims(
+                client,
+                make_for_trims,
+                model_variants,
+                year,
+                memory=ctx.aliases,
+                canonical_make=canonical_make,
+                canonical_model=model_name,
+            )
+        except CarQueryError as exc:
+            console.log(f"[yellow]CarQuery trims denied for {canonical_make} {model_name} {year}: {exc}")
+            trims_data = []
 
-            if active_trims and not settings.dry_run and model_id is not None:
-                mark_trims_inactive(engine, model_id=model_id, year=year, active_normalized_trims=active_trims)
+    if not trims_data:
+        anomalies.append(
+            {
+                "type": "no_trims",
+                "year": str(year),
+                "make": canonical_make,
+                "model": model_name,
+            }
+        )
+        return anomalies, trims
 
-    return anomalies
+    seen_trims: Set[str] = set()
+    for trim_entry in trims_data:
+        mapped = carquery.map_trim(trim_entry)
+        normalized_trim = mapped["normalized_trim_name"]
+        if not normalized_trim or normalized_trim in seen_trims:
+            continue
+        seen_trims.add(normalized_trim)
+        trim_key = f"{trim_entry.model_year}:{trim_entry.model_trim or trim_entry.model_name}"
+        trims.append((mapped, trim_key, trim_entry.model_dump()))
+
+    return anomalies, trims
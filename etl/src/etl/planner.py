@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List, Optional
+
+from rich.console import Console
+
+from .aliases import AliasMemory, order_attempts
+from .http import HTTPClient
+from .normalize import collapse_spaces, normalized_key
+from .sources import carquery
+from .sources.carquery import CarQueryError, CarQueryTrim
+
+# CarQuery caps getTrims responses; a response this large may be truncated,
+# so the year range is split and fetched in halves.
+CARQUERY_RESULT_LIMIT = 500
+
+console = Console()
+
+# year -> normalized model -> (model display name, trims)
+MakePartition = Dict[int, Dict[str, tuple[str, List[CarQueryTrim]]]]
+
+
+class SourcePlanner:
+    """Issues the widest CarQuery query per make and partitions it locally.
+
+    The first year that asks for a make fetches that make's trims for the
+    whole run's year range; later years are served from the in-memory
+    partition. Makes the bulk query cannot resolve return None so the caller
+    falls back to per-model probing.
+    """
+
+    def __init__(self, client: HTTPClient, aliases: AliasMemory, *, min_year: int, max_year: int) -> None:
+        self.client = client
+        self.aliases = aliases
+        self.min_year = min_year
+        self.max_year = max_year
+        self.tasks: Dict[str, asyncio.Task[Optional[tuple[str, MakePartition]]]] = {}
+
+    async def make_year(
+        self,
+        canonical_make: str,
+        make_candidates: List[str],
+        year: int,
+    ) -> Optional[tuple[str, Dict[str, tuple[str, List[CarQueryTrim]]]]]:
+        """Return (make spelling used, models with trims) for one make/year, or None."""
+        key = normalized_key(canonical_make)
+        task = self.tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_make(canonical_make, make_candidates))
+            self.tasks[key] = task
+        result = await asyncio.shield(task)
+        if result is None:
+            return None
+        make_used, partition = result
+        models = partition.get(year)
+        if not models:
+            return None
+        return make_used, models
+
+    def release_year(self, year: int) -> None:
+        """Drop a finished year's slices so memory stays bounded by the years left."""
+        for task in self.tasks.values():
+            if task.done() and not task.cancelled() and task.exception() is None and task.result() is not None:
+                task.result()[1].pop(year, None)
+
+    async def aclose(self) -> None:
+        """Cancel and reap bulk fetches still running, e.g. after a failed run."""
+        pending = [task for task in self.tasks.values() if not task.done()]
+        for task in pending:
+            task.cancel()
+        # Also retrieves the exceptions of fetches no caller awaited.
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+
+    async def _fetch_make(self, canonical_make: str, make_candidates: List[str]) -> Optional[tuple[str, MakePartition]]:
+        attempts = [(make, None, sold_in_us) for make in make_candidates for sold_in_us in (True, False)]
+        for make, _, sold_in_us in order_attempts(attempts, self.aliases.preferred(canonical_make)):
+            try:
+                trims = await self._fetch_range(make, sold_in_us, self.min_year, self.max_year)
+            except CarQueryError as exc:
+                if "denied" in str(exc).lower():
+                    console.log(f"[yellow]CarQuery bulk trims denied for {canonical_make}: {exc}")
+                    return None
+                continue
+            if trims is None:
+                console.log(f"[yellow]CarQuery bulk trims for {canonical_make} capped within one year; probing per model")
+                return None
+            if trims:
+                self.aliases.record_hit(canonical_make, None, make=make, model=None, sold_in_us=sold_in_us)
+                return make, partition_trims(trims)
+        return None
+
+    async def _fetch_range(
+        self, make: str, sold_in_us: bool, min_year: int, max_year: int
+    ) -> Optional[List[CarQueryTrim]]:
+        """Trims for the range, or None if a single year is still at the result cap.
+
+        A capped single-year list may be truncated, and merging it would mark
+        the trims it is missing inactive.
+        """
+        trims = await carquery.get_trims_for_make(
+            self.client, make, min_year=min_year, max_year=max_year, sold_in_us=sold_in_us
+        )
+        if len(trims) < CARQUERY_RESULT_LIMIT:
+            return trims
+        if min_year == max_year:
+            return None
+        middle = (min_year + max_year) // 2
+        lower, upper = await asyncio.gather(
+            self._fetch_range(make, sold_in_us, min_year, middle),
+            self._fetch_range(make, sold_in_us, middle + 1, max_year),
+        )
+        if lower is None or upper is None:
+            return None
+        return lower + upper
+
+
+def partition_trims(trims: List[CarQueryTrim]) -> MakePartition:
+    partition: MakePartition = {}
+    for trim in trims:
+        model_name = collapse_spaces(trim.model_name)
+        if not model_name:
+            continue
+        models = partition.setdefault(trim.model_year, {})
+        normalized_model = normalized_key(model_name)
+        if normalized_model not in models:
+            models[normalized_model] = (model_name, [])
+        models[normalized_model][1].append(trim)
+    return partition
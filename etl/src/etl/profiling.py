@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List
+
+# A loop wake-up later than this counts as a stall (something blocked the loop).
+STALL_SECONDS = 0.1
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps `interval` seconds.
+
+    Any lateness is time the loop spent running other callbacks without
+    yielding, i.e. blocking work on the loop thread (parsing, SQL, hashing).
+    """
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.expected: float | None = None
+        self.task: asyncio.Task[None] | None = None
+
+    def _record(self, lag: float) -> None:
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= STALL_SECONDS:
+            self.stalls += 1
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self.expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._record(max(0.0, loop.time() - self.expected))
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        # A stall right before stop() has delayed the pending wake-up without
+        # the monitor getting to run; count it now.
+        overdue = asyncio.get_running_loop().time() - (self.expected or float("inf"))
+        if overdue > 0:
+            self._record(overdue)
+        self.task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.task
+        self.task = None
+
+
+class SyncProfiler:
+    """Per-year cProfile sessions plus an event-loop time breakdown.
+
+    For each year, writes `year_<year>.prof` (load with pstats or snakeviz)
+    and `year_<year>.txt` (top functions by cumulative and own time) to
+    `out_dir`, and `summary.json` for the run. The breakdown splits the
+    year's wall time into loop-thread CPU (`busy_seconds`) and time spent
+    waiting on awaits (`await_seconds`: network, thread pool, sleeps), and
+    reports loop lag from LoopLagMonitor. Work done in worker threads (cache
+    I/O) is not in the cProfile data.
+    """
+
+    def __init__(self, out_dir: Path, *, top: int = 40) -> None:
+        self.out_dir = out_dir
+        self.top = top
+        self.years: List[Dict[str, Any]] = []
+
+    @contextlib.asynccontextmanager
+    async def year(self, year: int) -> AsyncIterator[None]:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        monitor = LoopLagMonitor()
+        monitor.start()
+        profiler = cProfile.Profile()
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            wall = time.perf_counter() - wall_started
+            busy = time.thread_time() - cpu_started
+            await monitor.stop()
+            self._write_year(year, profiler)
+            self.years.append(
+                {
+                    "year": year,
+                    "wall_seconds": round(wall, 3),
+                    "busy_seconds": round(busy, 3),
+                    "await_seconds": round(max(0.0, wall - busy), 3),
+                    "loop_lag_total_seconds": round(monitor.total_lag, 3),
+                    "loop_lag_max_seconds": round(monitor.max_lag, 3),
+                    "loop_stalls": monitor.stalls,
+                }
+            )
+
+    def _write_year(self, year: int, profiler: cProfile.Profile) -> None:
+        profiler.dump_stats(self.out_dir / f"year_{year}.prof")
+        report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=report).strip_dirs()
+        for sort in ("cumulative", "tottime"):
+            report.write(f"== year {year}, top {self.top} by {sort} ==\n")
+            stats.sort_stats(sort).print_stats(self.top)
+        (self.out_dir / f"year_{year}.txt").write_text(report.getvalue())
+
+    def write_summary(self) -> Path:
+        path = self.out_dir / "summary.json"
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"stall_seconds": STALL_SECONDS, "years": self.years}, indent=2) + "\n")
+        return path
@@ -1,16 +1,14 @@
 from __future__ import annotations
 
-import json
-import re
 from typing import Any, Dict, List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
+from .. import codec
 from ..http import HTTPClient
 from ..normalize import normalize_make_name, normalized_key, clean_trim_name, derive_standard_transmission, normalize_drivetrain, collapse_spaces
 
 CARQUERY_BASE = "https://www.carqueryapi.com/api/0.3/"
-JSONP_RE = re.compile(r"^[^(]+\((.*)\);?$")
 
 
 class CarQueryTrim(BaseModel):
@@ -29,14 +27,26 @@ class CarQueryTrim(BaseModel):
     }
 
 
+# Validates a whole trim list in one call into pydantic-core rather than one
+# model constructor per item.
+TRIMS_ADAPTER = TypeAdapter(List[CarQueryTrim])
+
+
+def decode(response: str) -> Any:
+    return codec.loads(codec.strip_jsonp(response))
+
+
+def parse_trims(data: Dict[str, Any]) -> List[CarQueryTrim]:
+    return TRIMS_ADAPTER.validate_python(data.get("Trims", []))
+
+
 async def _call(client: HTTPClient, params: Dict[str, Any]) -> Dict[str, Any]:
     # CarQuery expects query in `cmd`
-    response = await client.get_text(CARQUERY_BASE, params=params)
-    match = JSONP_RE.match(response.strip())
-    if match:
-        response = match.group(1)
-    data = json.loads(response)
+    data = decode(await client.get_text(CARQUERY_BASE, params=params))
     if isinstance(data, dict) and data.get("error"):
+        # Error payloads arrive with a 200; keep them out of the cache so a
+        # temporary denial is not replayed on later runs.
+        await client.invalidate(CARQUERY_BASE, params=params)
         raise CarQueryError(data["error"])
     return data
 
@@ -69,7 +79,28 @@ async def get_trims(client: HTTPClient, make: str, model: str, year: int, *, sol
     if sold_in_us:
         params["sold_in_us"] = 1
     data = await _call(client, params)
-    return [CarQueryTrim(**item) for item in data.get("Trims", [])]
+    return parse_trims(data)
+
+
+async def get_trims_for_make(
+    client: HTTPClient,
+    make: str,
+    *,
+    min_year: int,
+    max_year: int,
+    sold_in_us: bool = True,
+) -> List[CarQueryTrim]:
+    """Fetch every trim of a make across a model-year range in one call."""
+    params: Dict[str, Any] = {
+        "cmd": "getTrims",
+        "make": make,
+        "min_year": min_year,
+        "max_year": max_year,
+    }
+    if sold_in_us:
+        params["sold_in_us"] = 1
+    data = await _call(client, params)
+    return parse_trims(data)
 
 
 def map_trim(trim: CarQueryTrim) -> Dict[str, Any]:
@@ -1,13 +1,13 @@
 from __future__ import annotations
 
-from typing import List
-
-import json
-import xmltodict
+from typing import Any, List
+from xml.etree.ElementTree import XMLPullParser
 
+from .. import codec
 from ..http import HTTPClient
 
 DOE_BASE = "https://www.fueleconomy.gov/ws/rest/vehicle/menu"
+XML_CHUNK_SIZE = 64 * 1024
 
 
 def _ensure_list(value):
@@ -18,33 +18,64 @@ def _ensure_list(value):
     return [value]
 
 
-def _parse(text: str) -> dict:
+def _json_texts(data: Any) -> List[str]:
+    items = (data.get("menuItems") or data) if isinstance(data, dict) else data
+    if isinstance(items, dict) and "menuItem" in items:
+        items = items.get("menuItem")
+    return [item["text"].strip() for item in _ensure_list(items)]
+
+
+def _xml_texts(text: str) -> List[str]:
+    # Fed in chunks and drained between them, so each <menuItem> is read and
+    # dropped from the root as soon as it closes.
+    parser = XMLPullParser(events=("start", "end"))
+    root = None
+    texts: List[str] = []
+
+    def drain() -> None:
+        nonlocal root
+        for event, element in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = element
+                continue
+            if element.tag != "menuItem":
+                continue
+            value = element.findtext("text")
+            if value is not None:
+                texts.append(value.strip())
+            element.clear()
+            # Items close in order, so a consumed one is always the root's first child.
+            if root is not None and len(root) and root[0] is element:
+                del root[0]
+
+    for offset in range(0, len(text), XML_CHUNK_SIZE):
+        parser.feed(text[offset : offset + XML_CHUNK_SIZE])
+        drain()
+    parser.close()
+    drain()
+    return texts
+
+
+def menu_texts(text: str) -> List[str]:
+    """The `<text>` of every menu item in a DOE menu response (XML or JSON)."""
     text = text.strip()
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        # remove any leading junk before '<'
-        idx = text.find("<")
-        if idx > 0:
-            text = text[idx:]
-        return xmltodict.parse(text)
+    if text[:1] in ("{", "["):
+        return _json_texts(codec.loads(text))
+    # remove any leading junk before '<'
+    idx = text.find("<")
+    if idx > 0:
+        text = text[idx:]
+    return _xml_texts(text)
 
 
 async def get_makes(client: HTTPClient, year: int) -> List[str]:
     url = f"{DOE_BASE}/make"
     text = await client.get_text(url, params={"year": year})
-    data = _parse(text)
-    items = data.get("menuItems") or data
-    if isinstance(items, dict) and "menuItem" in items:
-        items = items.get("menuItem")
-    return [item["text"].strip() for item in _ensure_list(items)]
+    return menu_texts(text)
 
 
 async def get_models(client: HTTPClient, year: int, make: str) -> List[str]:
     url = f"{DOE_BASE}/model"
     text = await client.get_text(url, params={"year": year, "make": make})
-    data = _parse(text)
-    items = data.get("menuItems") or data
-    if isinstance(items, dict) and "menuItem" in items:
-        items = items.get("menuItem")
-    return [item["text"].strip() for item in _ensure_list(items)]
+    return menu_texts(text)
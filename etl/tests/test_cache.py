@@ -0,0 +1,95 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from etl.cache import CacheEntry, FileCacheBackend, SQLiteCacheBackend, create_backend
+from etl.http import HTTPCache
+
+
+def _entry(body):
+    return CacheEntry(kind="text", body=body, fetched_at=time.time(), etag='"e"')
+
+
+def test_sqlite_backend_round_trip_and_batched_reads(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.sqlite3")
+    backend.write("a", _entry("alpha"))
+    backend.write("b", CacheEntry(kind="json", body={"Results": [1]}, fetched_at=1.0))
+
+    entries = backend.read_many(["a", "b", "missing"])
+    assert entries["a"].body == "alpha"
+    assert entries["a"].etag == '"e"'
+    assert entries["b"].body == {"Results": [1]}
+    assert "missing" not in entries
+
+    backend.delete("a")
+    assert backend.read("a") is None
+    backend.close()
+
+
+def test_sqlite_backend_evicts_least_recently_read(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.sqlite3")
+    payload = "x" * 2000 + "".join(str(i) for i in range(400))
+    for key in ("old", "unread", "new"):
+        backend.write(key, _entry(payload + key))
+        time.sleep(0.01)
+    backend.read("old")
+    entry_size = backend.total_bytes // 3
+    backend.max_bytes = entry_size * 3 + 1
+    time.sleep(0.01)
+
+    backend.write("newest", _entry(payload + "newest"))
+
+    assert backend.read("unread") is None
+    assert backend.read("old") is not None
+    assert backend.read("newest") is not None
+    assert backend.total_bytes <= backend.max_bytes
+    backend.close()
+
+
+def test_sqlite_backend_keeps_access_times_from_reader_threads(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    backend = SQLiteCacheBackend(path)
+    keys = [f"k{i}" for i in range(50)]
+    for key in keys:
+        backend.write(key, CacheEntry(kind="text", body=key, fetched_at=1.0))
+    started = time.time()
+
+    def read(key):
+        backend.read(key)
+        backend.write(f"w-{key}", _entry(key))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(read, keys))
+    backend.close()
+
+    conn = sqlite3.connect(path)
+    stale = conn.execute(
+        f"SELECT key FROM entries WHERE key IN ({', '.join('?' for _ in keys)}) AND accessed_at < ?",
+        [*keys, started],
+    ).fetchall()
+    conn.close()
+    assert stale == []
+
+
+def test_file_backend_reads_legacy_entries(tmp_path):
+    (tmp_path / "legacy.json").write_text('{"Results": []}')
+    backend = create_backend("file", tmp_path)
+    assert isinstance(backend, FileCacheBackend)
+    entry = backend.read("legacy")
+    assert entry.kind == "json"
+    assert entry.body == {"Results": []}
+
+
+@pytest.mark.asyncio
+async def test_http_cache_concurrent_access_is_atomic(tmp_path):
+    cache = HTTPCache(tmp_path, enabled=True)
+    urls = [f"https://vpic.nhtsa.dot.gov/api/vehicles/m/{i}" for i in range(20)]
+
+    await asyncio.gather(*(cache.set(url, None, {"i": i}) for i, url in enumerate(urls)))
+    results = await asyncio.gather(*(cache.get(url, None) for url in urls))
+
+    assert results == [{"i": i} for i in range(20)]
+    assert not list(tmp_path.glob("*.tmp")) and not list(tmp_path.glob(".*.tmp"))
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from etl import db
+
+
+def test_evidence_buffer_hands_over_batches_for_write_evidence():
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine, tables=[db.trim_evidence])
+    buffer = db.EvidenceBuffer(flush_size=2)
+
+    for trim_id in range(3):
+        buffer.add(trim_id=trim_id, source="carquery", payload={"model_trim": f"T{trim_id}"})
+        if buffer.full:
+            db.write_evidence(engine, buffer.take())
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(db.trim_evidence)).scalar_one() == 2
+    assert len(buffer.rows) == 1
+
+    db.write_evidence(engine, buffer.take())
+    assert not buffer.rows
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(db.trim_evidence)).scalar_one() == 3
+        payloads = conn.execute(select(db.trim_evidence.c.payload).order_by(db.trim_evidence.c.trim_id)).scalars().all()
+    assert payloads[2] == {"model_trim": "T2"}
+
+
+def test_identity_map_skips_unchanged_and_touches_in_bulk():
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine, tables=[db.makes, db.models])
+    with engine.begin() as conn:
+        conn.execute(db.makes.insert().values(id=1, name="Toyota", normalized_name="toyota", source="carquery", source_key="toyota", country="US"))
+        conn.execute(
+            db.models.insert().values(
+                id=7, make_id=1, name="Camry", normalized_name="camry", source="carquery", source_key="camry", first_year=2020, last_year=2023
+            )
+        )
+
+    identity = db.IdentityMap.load(engine)
+    assert identity.make_id("toyota", db.make_signature("Toyota", "carquery", "toyota", "US")) == (1, True)
+    assert identity.make_id("toyota", db.make_signature("Toyota", "doe", "Toyota", "US")) == (1, False)
+    assert identity.make_id("honda", db.make_signature("Honda", "doe", "Honda", "US")) == (None, False)
+    camry = db.model_signature("Camry", "carquery", "camry")
+    assert identity.model_id(1, "camry", camry, 2022) == (7, True)
+    assert identity.model_id(1, "camry", camry, 2024) == (7, False)
+
+    identity.remember_model(1, "camry", 7, camry, 2024)
+    assert identity.model_id(1, "camry", camry, 2024) == (7, True)
+
+    identity.touch_make(1)
+    identity.touch_model(7)
+    db.write_touched(engine, identity.take_touched())
+    with engine.connect() as conn:
+        assert conn.execute(select(db.makes.c.last_verified_at)).scalar_one() is not None
+        assert conn.execute(select(db.models.c.last_verified_at)).scalar_one() is not None
+    assert not identity.touched_makes and not identity.touched_models
+
+    identity.touch_trims(2023, [7])
+    identity.touch_trims(2024, [7])
+    assert identity.take_touched(through_year=2023)[2] == {2023: {7}}
+    assert identity.touched_trims == {2024: {7}}
+
+
+def _trim(model_id, year, name):
+    return db.trim_row(
+        model_id=model_id,
+        year=year,
+        trim_name=name.upper(),
+        normalized_trim_name=name,
+        attributes={"body": "Sedan"},
+        source="carquery",
+        source_key=f"{year}:{name}",
+    )
+
+
+def test_merge_year_trims_upserts_and_inactivates_in_one_pass():
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine, tables=[db.trims])
+    db.merge_year_trims(engine, 2024, [_trim(1, 2024, "le"), _trim(1, 2024, "se"), _trim(2, 2024, "base")])
+    db.merge_year_trims(engine, 2023, [_trim(1, 2023, "se")])
+
+    ids = db.merge_year_trims(engine, 2024, [_trim(1, 2024, "le"), _trim(1, 2024, "xle")])
+
+    assert set(ids) == {(1, 2024, "le"), (1, 2024, "xle")}
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(db.trims.c.model_id, db.trims.c.year, db.trims.c.normalized_trim_name, db.trims.c.is_active)
+        ).all()
+    assert sorted(rows) == [
+        (1, 2023, "se", True),
+        (1, 2024, "le", True),
+        (1, 2024, "se", False),
+        (1, 2024, "xle", True),
+        (2, 2024, "base", True),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_database_keeps_the_event_loop_free():
+    engine = db.get_engine("sqlite://")
+    db.metadata.create_all(engine, tables=[db.makes])
+    database = db.AsyncDatabase(engine)
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    def slow_upsert(conn):
+        time.sleep(0.1)  # stands in for a slow commit
+        return db.upsert_make(conn, name="Toyota", normalized_name="toyota", source="carquery", source_key="toyota")
+
+    ticker = asyncio.create_task(tick())
+    make_id = await database.run(slow_upsert)
+    ticker.cancel()
+    await database.dispose()
+
+    assert make_id == 1
+    assert ticks >= 5
+    with engine.connect() as conn:
+        assert conn.execute(select(db.makes.c.name)).scalar_one() == "Toyota"
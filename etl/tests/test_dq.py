@@ -0,0 +1,53 @@
+import csv
+import json
+
+from etl.dq import ReportWriter, default_report_path
+
+
+def _read(path):
+    with path.open(newline="") as csvfile:
+        return list(csv.DictReader(csvfile))
+
+
+def test_report_streams_deduplicates_and_diffs(tmp_path):
+    # Hand-named reports sort after the timestamped ones but are never diffed against.
+    for name in ("dq_latest.csv", "dq_2015_2022.csv"):
+        (tmp_path / name).write_text("type,year,make,model\nno_makes,2015,,\n")
+    first = tmp_path / "dq_20240101_000000.csv"
+    report = ReportWriter(first)
+    report.write([{"type": "no_trims", "year": "2024", "make": "Acura", "model": "MDX"}])
+    report.write(
+        [
+            {"type": "no_trims", "year": "2024", "make": "Acura", "model": "MDX"},
+            {"type": "no_makes", "year": "2025"},
+        ]
+    )
+    assert len(first.with_suffix(".jsonl").read_text().splitlines()) == 2
+    assert report.previous is None
+    report.close()
+    assert [row["type"] for row in _read(first)] == ["no_trims", "no_makes"]
+    assert list(_read(first)[0]) == ["make", "model", "type", "year"]
+    assert not (tmp_path / "dq_20240101_000000_new.csv").exists()
+
+    second = tmp_path / "dq_20240102_000000.csv"
+    report = ReportWriter(second)
+    assert report.previous == first
+    report.write(
+        [
+            {"type": "no_makes", "year": "2025"},
+            {"type": "model_missing_doe", "year": "2024", "make": "BMW", "model": "X5", "best_match": "X6"},
+        ]
+    )
+    report.close()
+    assert len(_read(second)) == 2
+    new_rows = _read(tmp_path / "dq_20240102_000000_new.csv")
+    assert [(row["type"], row["best_match"]) for row in new_rows] == [("model_missing_doe", "X6")]
+    assert json.loads(second.with_suffix(".jsonl").read_text().splitlines()[1])["make"] == "BMW"
+
+
+def test_failed_run_leaves_no_report(tmp_path):
+    path = default_report_path(tmp_path)
+    report = ReportWriter(path)
+    report.write([{"type": "no_makes", "year": "2025"}])
+    report.close(completed=False)
+    assert list(tmp_path.iterdir()) == []
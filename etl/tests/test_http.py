@@ -0,0 +1,174 @@
+import asyncio
+
+import httpx
+import pytest
+import respx
+
+from etl.http import HTTPCache, HTTPClient, OfflineMiss, RateLimiter, create_client
+
+
+@pytest.mark.asyncio
+async def test_throttled_response_backs_off_and_retries(tmp_path):
+    limiter = RateLimiter(max_concurrency=4, limits={"vpic.nhtsa.dot.gov": (8.0, 16.0)})
+    client = HTTPClient(timeout=5, cache=HTTPCache(tmp_path, enabled=False), rate_limiter=limiter)
+    with respx.mock(base_url="https://vpic.nhtsa.dot.gov") as mock:
+        route = mock.get("/api/vehicles/getallmakes").mock(
+            side_effect=[
+                httpx.Response(429, headers={"Retry-After": "0"}),
+                httpx.Response(200, json={"Results": []}),
+            ]
+        )
+        data = await client.get_json("https://vpic.nhtsa.dot.gov/api/vehicles/getallmakes")
+    host = limiter.hosts["vpic.nhtsa.dot.gov"]
+    assert data == {"Results": []}
+    assert route.call_count == 2
+    assert host.rate < 8.0
+    assert host.concurrency < 4
+    assert host.in_flight == 0
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_are_not_rate_limited(tmp_path):
+    cache = HTTPCache(tmp_path, enabled=True)
+    url = "https://vpic.nhtsa.dot.gov/api/vehicles/getallmakes"
+    await cache.set(url, None, {"Results": [1]})
+    client = HTTPClient(timeout=5, cache=cache)
+    with respx.mock(assert_all_called=False) as mock:
+        route = mock.get(url)
+        assert await client.get_json(url) == {"Results": [1]}
+    assert not route.called
+    assert client.rate_limiter.hosts == {}
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_text_responses_are_cached(tmp_path):
+    client = HTTPClient(timeout=5, cache=HTTPCache(tmp_path, enabled=True))
+    url = "https://www.fueleconomy.gov/ws/rest/vehicle/menu/make"
+    with respx.mock() as mock:
+        route = mock.get(url).respond(200, text="<menuItems/>")
+        assert await client.get_text(url, params={"year": 2024}) == "<menuItems/>"
+        assert await client.get_text(url, params={"year": 2024}) == "<menuItems/>"
+    assert route.call_count == 1
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stale_entries_are_revalidated(tmp_path):
+    client = HTTPClient(timeout=5, cache=HTTPCache(tmp_path, enabled=True, ttl=0), memo_size=0)
+    url = "https://www.carqueryapi.com/api/0.3/"
+    with respx.mock() as mock:
+        route = mock.get(url).mock(
+            side_effect=[
+                httpx.Response(200, text='{"Makes": []}', headers={"ETag": '"v1"'}),
+                httpx.Response(304),
+            ]
+        )
+        first = await client.get_text(url, params={"cmd": "getMakes"})
+        second = await client.get_text(url, params={"cmd": "getMakes"})
+    assert first == second == '{"Makes": []}'
+    assert route.calls[1].request.headers["If-None-Match"] == '"v1"'
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_identical_in_flight_requests_are_coalesced(tmp_path):
+    client = HTTPClient(timeout=5, cache=HTTPCache(tmp_path, enabled=False))
+    url = "https://www.carqueryapi.com/api/0.3/"
+
+    async def slow_response(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, text='{"Models": []}')
+
+    with respx.mock() as mock:
+        route = mock.get(url).mock(side_effect=slow_response)
+        results = await asyncio.gather(
+            *(client.get_text(url, params={"cmd": "getModels", "make": "toyota"}) for _ in range(5)),
+            client.get_text(url, params={"cmd": "getModels", "make": "honda"}),
+        )
+    assert results == ['{"Models": []}'] * 6
+    assert route.call_count == 2
+    assert client.coalesced_requests == 4
+    assert client.network_requests == 2
+    assert client.in_flight == {}
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_completed_responses_answer_repeats_until_invalidated(tmp_path):
+    client = HTTPClient(timeout=5, cache=HTTPCache(tmp_path, enabled=False), memo_size=1)
+    url = "https://www.carqueryapi.com/api/0.3/"
+    toyota, honda = {"cmd": "getModels", "make": "toyota"}, {"cmd": "getModels", "make": "honda"}
+    with respx.mock() as mock:
+        route = mock.get(url).respond(200, text='{"Models": []}')
+        await client.get_text(url, params=toyota)
+        await client.get_text(url, params=toyota)
+        assert route.call_count == 1
+        assert client.coalesced_requests == 1
+
+        await client.invalidate(url, params=toyota)
+        await client.get_text(url, params=toyota)
+        assert route.call_count == 2
+
+        # memo_size=1: honda's response evicts toyota's.
+        await client.get_text(url, params=honda)
+        await client.get_text(url, params=toyota)
+        assert route.call_count == 4
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_aclose_cancels_fetches_whose_callers_went_away(tmp_path):
+    client = HTTPClient(timeout=5, cache=HTTPCache(tmp_path, enabled=False))
+    started = asyncio.Event()
+
+    async def hang(request):
+        started.set()
+        await asyncio.sleep(60)
+
+    url = "https://vpic.nhtsa.dot.gov/api/vehicles/getallmakes"
+    # The hanging route never returns, so respx does not count it as called.
+    with respx.mock(assert_all_called=False) as mock:
+        mock.get(url).mock(side_effect=hang)
+        caller = asyncio.ensure_future(client.get_json(url))
+        await started.wait()
+        caller.cancel()
+        (fetch,) = client.in_flight.values()
+        await client.aclose()
+    assert fetch.cancelled()
+    assert not client.in_flight
+
+
+@pytest.mark.asyncio
+async def test_recorded_bundle_replays_offline(tmp_path):
+    bundle = tmp_path / "fixtures"
+    cache = HTTPCache(tmp_path / "cache", enabled=True)
+    vpic_url = "https://vpic.nhtsa.dot.gov/api/vehicles/GetModelsForMakeYear/make/Acura/modelyear/2024"
+    await cache.set(vpic_url, {"format": "json"}, {"Results": [{"Model_Name": "MDX"}]})
+    recorder = HTTPClient(timeout=5, cache=cache, fixtures=HTTPCache(bundle))
+    doe_url = "https://www.fueleconomy.gov/ws/rest/vehicle/menu/make"
+    with respx.mock() as mock:
+        mock.get(doe_url).respond(200, text="<menuItems/>")
+        await recorder.get_text(doe_url, params={"year": 2024})
+        # Cache hits are recorded too, so a warm cache seeds the bundle.
+        await recorder.get_json(vpic_url, params={"format": "json"})
+    await recorder.aclose()
+
+    replay = HTTPClient(timeout=5, cache=HTTPCache(tmp_path / "unused", enabled=False), fixtures=HTTPCache(bundle), offline=True)
+    with respx.mock() as mock:
+        assert await replay.get_text(doe_url, params={"year": 2024}) == "<menuItems/>"
+        assert await replay.get_json(vpic_url, params={"format": "json"}) == {"Results": [{"Model_Name": "MDX"}]}
+        with pytest.raises(OfflineMiss):
+            await replay.get_text(doe_url, params={"year": 2023})
+        assert not mock.calls
+    assert replay.network_requests == 0
+    await replay.aclose()
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_creates_nothing_on_disk(tmp_path):
+    for backend in ("file", "sqlite"):
+        client = await create_client(5, str(tmp_path / backend), use_cache=False, cache_backend=backend)
+        await client.aclose()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,32 @@
+from etl import matching, pipeline
+from etl.matching import NameIndex
+
+
+def test_best_match_scores_naming_drift_above_designator_changes():
+    index = NameIndex(["A3 Sportback e-tron", "Model S", "GR86", "Silverado 2500HD", None, " "])
+
+    assert "a3 sportback e tron" in index
+    assert len(index) == 4
+    drift = index.best_match("a3 e tron")
+    assert drift.name == "A3 Sportback e-tron"
+    assert drift.score >= matching.ALIAS_THRESHOLD
+    assert index.best_match("gr 86").score == 1.0
+    assert index.best_match("model 3").score < matching.ALIAS_THRESHOLD
+    # No shared trigram, so nothing is scored at all.
+    assert index.best_match("camry") is None
+
+
+def test_missing_model_anomaly_carries_best_match():
+    index = NameIndex(["A3 Sportback e-tron", "Q5"])
+
+    alias = pipeline._missing_model_anomaly("vpic", 2024, "Audi", "A3 e-tron", "a3 e tron", index)
+    assert alias == {
+        "type": "model_alias_vpic",
+        "year": "2024",
+        "make": "Audi",
+        "model": "A3 e-tron",
+        "best_match": "A3 Sportback e-tron",
+        "match_score": "0.79",
+    }
+    missing = pipeline._missing_model_anomaly("doe", 2024, "Audi", "R8", "r8", index)
+    assert missing == {"type": "model_missing_doe", "year": "2024", "make": "Audi", "model": "R8"}
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from etl.http import request_labels
+from etl.metrics import Metrics, instrument_engine, statement_table
+
+
+def test_prometheus_textfile_has_cumulative_buckets():
+    metrics = Metrics()
+    metrics.inc("http_requests_total", host="vpic.nhtsa.dot.gov", status="200")
+    for value in (0.002, 0.02, 0.2, 60):
+        metrics.observe("http_request_seconds", value, host="vpic.nhtsa.dot.gov")
+
+    lines = metrics.prometheus().splitlines()
+    assert 'nmbli_etl_http_requests_total{host="vpic.nhtsa.dot.gov",status="200"} 1' in lines
+    assert 'nmbli_etl_http_request_seconds_bucket{host="vpic.nhtsa.dot.gov",le="0.005"} 1' in lines
+    assert 'nmbli_etl_http_request_seconds_bucket{host="vpic.nhtsa.dot.gov",le="0.25"} 3' in lines
+    assert 'nmbli_etl_http_request_seconds_bucket{host="vpic.nhtsa.dot.gov",le="+Inf"} 4' in lines
+    assert 'nmbli_etl_http_request_seconds_count{host="vpic.nhtsa.dot.gov"} 4' in lines
+
+    summary = metrics.summary()["histograms"]["http_request_seconds"][0]
+    assert summary["count"] == 4
+    assert summary["p50"] == 0.025
+
+
+def test_engine_statements_are_counted_per_table():
+    engine = create_engine("sqlite://")
+    metrics = Metrics()
+    instrument_engine(engine, metrics)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE trims (id INTEGER)"))
+        conn.execute(text("INSERT INTO trims (id) VALUES (1)"))
+        conn.execute(text("SELECT id FROM trims"))
+
+    assert metrics.counters["db_statements_total"][(("table", "trims"),)] == 3
+
+
+    # A failing statement must not leave state behind for the next one on the connection.
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT id FROM missing"))
+        conn.rollback()
+        conn.execute(text("SELECT id FROM trims"))
+        assert "metrics_started" not in conn.info
+    assert metrics.histograms["db_statement_seconds"][(("table", "trims"),)].count == 4
+    transactions = metrics.histograms["db_transaction_seconds"]
+    assert transactions[(("outcome", "commit"), ("table", "trims"))].count == 1
+
+
+def test_labels_avoid_per_request_cardinality():
+    assert statement_table('UPDATE "models" SET last_verified_at=?') == "models"
+    assert request_labels("https://www.carqueryapi.com/api/0.3/", {"cmd": "getTrims", "make": "bmw"}) == (
+        "www.carqueryapi.com",
+        "getTrims",
+    )
+    assert request_labels(
+        "https://vpic.nhtsa.dot.gov/api/vehicles/GetModelsForMakeYear/make/BMW/modelyear/2024", {"format": "json"}
+    ) == ("vpic.nhtsa.dot.gov", "GetModelsForMakeYear")
+    assert request_labels("https://www.fueleconomy.gov/ws/rest/vehicle/menu/model", {"year": 2024}) == (
+        "www.fueleconomy.gov",
+        "model",
+    )
@@ -1,3 +1,9 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from etl import normalize
 from etl.normalize import normalize_make_name, normalized_key, clean_trim_name
 
 
@@ -16,3 +22,30 @@ def test_clean_trim_name_removes_duplicate_drive():
     assert clean_trim_name("LE AWD AWD") == "LE AWD"
     assert clean_trim_name("LE FWD") == "LE FWD"
 
+
+GOLDEN = Path(__file__).parent / "data" / "normalize_golden.json"
+
+
+@pytest.mark.parametrize("name", sorted(json.loads(GOLDEN.read_text(encoding="utf-8"))))
+def test_matches_golden_corpus(name):
+    # Captured from the regex-per-call implementation before memoization; any
+    # difference changes normalized keys already stored in the database.
+    rows = json.loads(GOLDEN.read_text(encoding="utf-8"))[name]
+    function = getattr(normalize, name)
+    normalize.clear_caches()
+    assert [[value, function(value)] for value, _ in rows] == rows
+    # Second pass is served from the cache and must agree.
+    assert [[value, function(value)] for value, _ in rows] == rows
+    values = [value for value, _ in rows]
+    assert normalize.normalize_column(function, values + values) == [expected for _, expected in rows] * 2
+
+
+def test_normalize_column_computes_each_distinct_value_once():
+    calls = []
+
+    def key(value):
+        calls.append(value)
+        return value.lower()
+
+    assert normalize.normalize_column(key, ["Camry", "RAV4", "Camry"]) == ["camry", "rav4", "camry"]
+    assert calls == ["Camry", "RAV4"]
@@ -4,6 +4,7 @@ import pytest
 import respx
 import httpx
 
+from etl import codec
 from etl.http import HTTPCache, HTTPClient
 from etl.sources import carquery, vpic, doe
 
@@ -38,6 +39,29 @@ async def test_carquery_trim_mapping(tmp_path):
     await client.aclose()
 
 
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('callback({"Trims": []});', '{"Trims": []}'),
+        ('  cb({"a": "x(y)"})\n', '{"a": "x(y)"}'),
+        ('cb({"a": 1,\n "b": 2});', '{"a": 1,\n "b": 2}'),
+        ('{"a": "f(x)"}', '{"a": "f(x)"}'),
+        ('("a")', '("a")'),
+        ("", ""),
+    ],
+)
+def test_strip_jsonp(text, expected):
+    assert codec.strip_jsonp(text) == expected
+
+
+def test_carquery_bulk_trim_validation():
+    data = carquery.decode('?({"Trims": [{"model_make_id": "bmw", "model_name": "X5", "model_year": "2024"}]});')
+    trims = carquery.parse_trims(data)
+    assert trims == [carquery.CarQueryTrim(model_make_id="bmw", model_name="X5", model_year=2024)]
+    with pytest.raises(ValueError):
+        carquery.parse_trims({"Trims": [{"model_make_id": "bmw", "model_name": "X5"}]})
+
+
 @pytest.mark.asyncio
 async def test_vpic_models(tmp_path):
     cache = HTTPCache(tmp_path, enabled=False)
@@ -66,3 +90,23 @@ async def test_doe_models(tmp_path):
         models = await doe.get_models(client, 2024, "Toyota")
     assert models == ["Camry"]
     await client.aclose()
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("<menuItems><menuItem><text> Camry </text><value>Camry</value></menuItem></menuItems>", ["Camry"]),
+        ('<?xml version="1.0"?><menuItems><menuItem><text>A</text></menuItem><menuItem><text>B</text></menuItem></menuItems>', ["A", "B"]),
+        ("junk<menuItems/>", []),
+        ('{"menuItem": {"text": "Camry", "value": "Camry"}}', ["Camry"]),
+        ('{"menuItem": [{"text": "A"}, {"text": "B"}]}', ["A", "B"]),
+    ],
+)
+def test_doe_menu_texts(text, expected):
+    assert doe.menu_texts(text) == expected
+
+
+def test_doe_menu_texts_across_chunks(monkeypatch):
+    monkeypatch.setattr(doe, "XML_CHUNK_SIZE", 7)
+    items = "".join(f"<menuItem><text>Model {i}</text><value>{i}</value></menuItem>" for i in range(20))
+    assert doe.menu_texts(f"<menuItems>{items}</menuItems>") == [f"Model {i}" for i in range(20)]
@@ -0,0 +1,366 @@
+import asyncio
+import json
+
+import pytest
+
+from etl import pipeline
+from etl.aliases import AliasMemory
+from etl.config import Settings
+
+
+def _settings(tmp_path, **overrides):
+    values = dict(
+        database_url="postgresql://localhost/unused",
+        start_year=2024,
+        end_year=2024,
+        dry_run=True,
+        cache_dir=str(tmp_path / "cache"),
+        reports_dir=str(tmp_path / "reports"),
+        use_cache=False,
+        max_workers=4,
+    )
+    values.update(overrides)
+    return Settings(**values)
+
+
+def _sqlite_engine():
+    from etl import db
+
+    engine = db.get_engine("sqlite://")
+    db.metadata.create_all(engine)
+    return engine
+
+
+# Where each upstream call is patched; the `upstreams` fixture keys overrides by these names.
+UPSTREAMS = {
+    "doe_makes": (pipeline.doe, "get_makes"),
+    "doe_models": (pipeline.doe, "get_models"),
+    "cq_makes": (pipeline.carquery, "get_makes"),
+    "cq_models": (pipeline.carquery, "get_models"),
+    "cq_trims": (pipeline.carquery, "get_trims"),
+    "cq_trims_for_make": (pipeline.carquery, "get_trims_for_make"),
+    "vpic_models": (pipeline.vpic, "get_models_for_make_year"),
+}
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    """Stub every upstream with an empty answer; call with `name=stub` to override some."""
+
+    async def empty(*args, **kwargs):
+        return []
+
+    for module, name in UPSTREAMS.values():
+        monkeypatch.setattr(module, name, empty)
+
+    def override(**stubs):
+        for key, stub in stubs.items():
+            module, name = UPSTREAMS[key]
+            monkeypatch.setattr(module, name, stub)
+
+    return override
+
+
+@pytest.mark.asyncio
+async def test_sync_year_concurrent_makes_keep_report_order(tmp_path, upstreams):
+    delays = {"Acura": 0.05, "BMW": 0.0, "Chevrolet": 0.02}
+    in_flight = 0
+    peak = 0
+
+    async def get_doe_makes(client, year):
+        return list(delays)
+
+    async def get_models(client, make, year, *, sold_in_us=True):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(delays.get(make, 0))
+        in_flight -= 1
+        return [{"model_name": f"{make} One"}, {"model_name": f"{make} Two"}] if make in delays else []
+
+    upstreams(doe_makes=get_doe_makes, cq_models=get_models)
+
+    settings = _settings(tmp_path)
+    ctx = pipeline.SyncContext(settings=settings, engine=None, client=None)
+    anomalies = await pipeline.sync_year(2024, ctx)
+
+    assert peak > 1
+    assert [(row["make"], row["model"]) for row in anomalies] == [
+        ("Acura", "Acura One"),
+        ("Acura", "Acura Two"),
+        ("BMW", "BMW One"),
+        ("BMW", "BMW Two"),
+        ("Chevrolet", "Chevrolet One"),
+        ("Chevrolet", "Chevrolet Two"),
+    ]
+    assert all(row["type"] == "no_trims" for row in anomalies)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("years_in_flight", [1, 2])
+async def test_sync_years_overlaps_next_year_with_earlier_writes(tmp_path, monkeypatch, upstreams, years_in_flight):
+    events = []
+
+    async def get_doe_makes(client, year):
+        events.append(("discover", year))
+        return ["Acura", "BMW"]
+
+    async def get_models(client, make, year, *, sold_in_us=True):
+        # 2024 is slow upstream, so 2025 can be discovered while it is still in flight.
+        await asyncio.sleep(0.05 if year == 2024 else 0)
+        return [{"model_name": f"{make} {year}"}]
+
+    finish_year = pipeline._finish_year
+
+    def record_finish(batch, ctx):
+        events.append(("finish", batch.year))
+        return finish_year(batch, ctx)
+
+    upstreams(doe_makes=get_doe_makes, cq_models=get_models)
+    monkeypatch.setattr(pipeline, "_finish_year", record_finish)
+
+    settings = _settings(tmp_path, end_year=2025, max_workers=2, years_in_flight=years_in_flight)
+    ctx = pipeline.SyncContext(settings=settings, engine=None, client=None)
+    anomalies = await pipeline.sync_years([2024, 2025], ctx)
+
+    if years_in_flight == 1:
+        assert events.index(("discover", 2025)) > events.index(("finish", 2024))
+    else:
+        assert events.index(("discover", 2025)) < events.index(("finish", 2024))
+    assert [row["model"] for row in anomalies[2024]] == ["Acura 2024", "BMW 2024"]
+    assert [row["model"] for row in anomalies[2025]] == ["Acura 2025", "BMW 2025"]
+
+
+@pytest.mark.asyncio
+async def test_doe_models_are_prefetched_for_the_whole_year(tmp_path, upstreams):
+    in_flight = 0
+    peak = 0
+
+    async def get_doe_makes(client, year):
+        return ["Acura", "BMW", "Chevrolet"]
+
+    async def get_doe_models(client, year, make):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        if make == "BMW":
+            raise RuntimeError("menu unavailable")
+        return [f"{make} One"]
+
+    async def get_models(client, make, year, *, sold_in_us=True):
+        return [{"model_name": f"{make} One"}]
+
+    upstreams(doe_makes=get_doe_makes, doe_models=get_doe_models, cq_models=get_models)
+
+    # One fetch worker: the DOE requests still overlap because discovery starts them.
+    ctx = pipeline.SyncContext(settings=_settings(tmp_path, max_workers=1), engine=None, client=None)
+    anomalies = await pipeline.sync_year(2024, ctx)
+
+    assert peak == 3
+    assert [row["make"] for row in anomalies if row["type"] == "doe_models_fetch_failed"] == ["BMW"]
+    assert not [row for row in anomalies if row["type"] == "model_missing_doe"]
+    assert ctx.doe_models.indexes == {}
+
+
+@pytest.mark.asyncio
+async def test_bulk_trims_fill_in_the_listed_models(tmp_path, upstreams):
+    from etl.planner import SourcePlanner
+    from etl.sources.carquery import CarQueryTrim
+
+    async def get_doe_makes(client, year):
+        return ["Toyota"]
+
+    async def get_models(client, make, year, *, sold_in_us=True):
+        return [{"model_name": "Camry"}, {"model_name": "Supra"}]
+
+    async def get_trims_for_make(client, make, *, min_year, max_year, sold_in_us=True):
+        return [CarQueryTrim(model_make_id="toyota", model_name="Camry", model_trim="LE", model_year=2024)]
+
+    upstreams(doe_makes=get_doe_makes, cq_models=get_models, cq_trims_for_make=get_trims_for_make)
+
+    ctx = pipeline.SyncContext(settings=_settings(tmp_path), engine=None, client=None)
+    ctx.planner = SourcePlanner(None, ctx.aliases, min_year=2024, max_year=2024)
+    anomalies = await pipeline.sync_year(2024, ctx)
+
+    # Supra has no trims in the bulk response but CarQuery lists it, so it is still reported.
+    assert [(row["type"], row["model"]) for row in anomalies] == [("no_trims", "Supra")]
+
+
+@pytest.mark.asyncio
+async def test_trim_probing_reuses_remembered_spelling(tmp_path, upstreams):
+    calls = []
+
+    async def get_trims(client, make, model, year, *, sold_in_us=True):
+        calls.append((make, model, sold_in_us, year))
+        if make == "Mercedes Benz" and model == "C-Class" and not sold_in_us:
+            return ["trim"]
+        return []
+
+    upstreams(cq_trims=get_trims)
+    path = tmp_path / "aliases.json"
+    memory = AliasMemory.load(path)
+    makes = ["Mercedes-Benz", "Mercedes Benz"]
+    models = ["C Class", "C-Class"]
+
+    async def probe(memory, year):
+        return await pipeline._fetch_carquery_trims(
+            None, makes, models, year, memory=memory, canonical_make="Mercedes-Benz", canonical_model="C Class"
+        )
+
+    assert await probe(memory, 2023) == ["trim"]
+    first_run = len(calls)
+    assert first_run > 1
+    memory.save()
+
+    calls.clear()
+    assert await probe(AliasMemory.load(path), 2024) == ["trim"]
+    assert calls == [("Mercedes Benz", "C-Class", False, 2024)]
+
+    # Without the remembered hit, earlier misses for 2023 are still skipped.
+    calls.clear()
+    memory = AliasMemory.load(path)
+    memory.hits.clear()
+    assert await probe(memory, 2023) == ["trim"]
+    assert calls == [("Mercedes Benz", "C-Class", False, 2023)]
+
+
+@pytest.mark.asyncio
+async def test_unchanged_slice_is_skipped_by_fingerprint(tmp_path, upstreams):
+    from sqlalchemy import event, select
+
+    from etl import db
+    from etl.sources.carquery import CarQueryTrim
+
+    trims = {"LE": "Sedan"}
+
+    async def get_doe_makes(client, year):
+        return ["Toyota"]
+
+    async def get_models(client, make, year, *, sold_in_us=True):
+        return [{"model_name": "Camry", "model_id": "camry"}] if make == "Toyota" else []
+
+    async def get_trims(client, make, model, year, *, sold_in_us=True):
+        return [
+            CarQueryTrim(model_make_id="toyota", model_name=model, model_trim=trim, model_year=year, model_body=body)
+            for trim, body in trims.items()
+        ]
+
+    upstreams(doe_makes=get_doe_makes, cq_models=get_models, cq_trims=get_trims)
+
+    engine = _sqlite_engine()
+    settings = _settings(tmp_path, dry_run=False)
+
+    async def run():
+        ctx = pipeline.SyncContext(settings=settings, engine=engine, client=None)
+        ctx.identity = db.IdentityMap.load(engine)
+        ctx.fingerprints = db.load_fingerprints(engine)
+        await pipeline.sync_year(2024, ctx)
+        await ctx.flush()
+        return ctx.stats
+
+    assert (await run()).trims_upserted == 1
+    assert db.load_fingerprints(engine).keys() == {("carquery", "toyota", 2024)}
+
+    writes = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            writes.append(statement.split()[0:3])
+
+    stats = await run()
+    assert stats.slices_unchanged == 1
+    assert stats.trims_upserted == 0
+    # Only the bulk last_verified_at touches: makes, models, trims.
+    assert [words[1] for words in writes] == ["makes", "models", "trims"]
+
+    writes.clear()
+    trims["XLE"] = "Sedan"
+    stats = await run()
+    assert stats.slices_unchanged == 0
+    assert stats.trims_upserted == 2
+    with engine.connect() as conn:
+        assert sorted(conn.execute(select(db.trims.c.trim_name)).scalars()) == ["LE", "XLE"]
+
+
+@pytest.mark.asyncio
+async def test_resume_skips_journaled_makes(tmp_path, upstreams):
+    from sqlalchemy import select
+
+    from etl import db
+    from etl.journal import JournalMismatch, SyncJournal
+    from etl.sources.carquery import CarQueryTrim
+
+    calls = []
+    fail = {"BMW"}
+
+    async def get_doe_makes(client, year):
+        return ["Acura", "BMW"]
+
+    async def get_models(client, make, year, *, sold_in_us=True):
+        calls.append(make)
+        if make in fail:
+            await asyncio.sleep(0.05)
+            raise RuntimeError("network blip")
+        return [{"model_name": f"{make} One"}] if make in ("Acura", "BMW") else []
+
+    async def get_trims(client, make, model, year, *, sold_in_us=True):
+        return [CarQueryTrim(model_make_id=make, model_name=model, model_trim="Base", model_year=year)]
+
+    upstreams(doe_makes=get_doe_makes, cq_models=get_models, cq_trims=get_trims)
+
+    engine = _sqlite_engine()
+    settings = _settings(tmp_path, dry_run=False)
+    path = tmp_path / "journal.jsonl"
+    run = {"years": [2024], "only_make": None, "dry_run": False}
+
+    def context(journal):
+        ctx = pipeline.SyncContext(settings=settings, engine=engine, client=None, journal=journal)
+        ctx.identity = db.IdentityMap.load(engine)
+        return ctx
+
+    journal = SyncJournal.open(path, run, resume=False)
+    with pytest.raises(ExceptionGroup):
+        await pipeline.sync_year(2024, context(journal))
+    journal.close(completed=False)
+    assert "Acura" in calls
+
+    calls.clear()
+    fail.clear()
+    journal = SyncJournal.open(path, run, resume=True)
+    ctx = context(journal)
+    await pipeline.sync_year(2024, ctx)
+    assert calls == ["BMW"]
+    assert ctx.stats.makes_upserted == 2  # Acura restored from the journal
+    assert ctx.stats.trims_upserted == 2
+    with engine.connect() as conn:
+        assert sorted(conn.execute(select(db.trims.c.model_id)).scalars()) == [1, 2]
+    journal.close(completed=True)
+    assert not path.exists()
+
+    SyncJournal.open(path, run, resume=False).close(completed=False)
+    with pytest.raises(JournalMismatch):
+        SyncJournal.open(path, {**run, "years": [2023]}, resume=True)
+
+
+
+@pytest.mark.asyncio
+async def test_failed_sync_still_writes_metrics(tmp_path, monkeypatch):
+    async def sync_years(years, ctx):
+        raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(pipeline, "sync_years", sync_years)
+    settings = _settings(
+        tmp_path,
+        database_url=f"sqlite:///{tmp_path / 'etl.sqlite3'}",
+        journal_path=str(tmp_path / "journal.jsonl"),
+        alias_memory_path=str(tmp_path / "aliases.json"),
+    )
+    with pytest.raises(RuntimeError):
+        await pipeline.sync(settings)
+
+    (metrics_path,) = (tmp_path / "reports").glob("metrics_*.json")
+    runs = json.loads(metrics_path.read_text())["counters"]["sync_runs_total"]
+    assert runs == [{"labels": {"status": "failed"}, "value": 1}]
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from etl import planner
+from etl.aliases import AliasMemory
+from etl.sources.carquery import CarQueryTrim
+
+
+def _trim(model, year, trim):
+    return CarQueryTrim(model_make_id="toyota", model_name=model, model_trim=trim, model_year=year)
+
+
+CATALOG = [
+    _trim("Camry", 2023, "LE"),
+    _trim("Camry", 2023, "SE"),
+    _trim("Camry", 2024, "LE"),
+    _trim("RAV4", 2024, "XLE"),
+    _trim("Corolla", 2022, "L"),
+]
+
+
+@pytest.mark.asyncio
+async def test_planner_fetches_each_make_once_and_partitions_by_year(monkeypatch):
+    calls = []
+
+    async def get_trims_for_make(client, make, *, min_year, max_year, sold_in_us=True):
+        calls.append((make, min_year, max_year, sold_in_us))
+        if make != "toyota":
+            return []
+        return [trim for trim in CATALOG if min_year <= trim.model_year <= max_year]
+
+    monkeypatch.setattr(planner.carquery, "get_trims_for_make", get_trims_for_make)
+    monkeypatch.setattr(planner, "CARQUERY_RESULT_LIMIT", 4)
+    source_planner = planner.SourcePlanner(None, AliasMemory(), min_year=2022, max_year=2024)
+
+    make_used, models_2024 = await source_planner.make_year("Toyota", ["Toyota", "toyota"], 2024)
+    assert make_used == "toyota"
+    assert {key: [t.model_trim for t in trims] for key, (_, trims) in models_2024.items()} == {
+        "camry": ["LE"],
+        "rav4": ["XLE"],
+    }
+    _, models_2023 = await source_planner.make_year("Toyota", ["Toyota", "toyota"], 2023)
+    assert list(models_2023) == ["camry"]
+    assert await source_planner.make_year("Toyota", ["Toyota", "toyota"], 2021) is None
+
+    # Two empty probes for the "Toyota" spelling, then one truncated-looking
+    # response for 2022-2024 that is split into 2022-2023 and 2024.
+    assert calls == [
+        ("Toyota", 2022, 2024, True),
+        ("Toyota", 2022, 2024, False),
+        ("toyota", 2022, 2024, True),
+        ("toyota", 2022, 2023, True),
+        ("toyota", 2024, 2024, True),
+    ]
+
+    source_planner.release_year(2024)
+    assert await source_planner.make_year("Toyota", ["Toyota"], 2024) is None
+
+
+@pytest.mark.asyncio
+async def test_planner_falls_back_when_a_single_year_is_capped(monkeypatch):
+    async def get_trims_for_make(client, make, *, min_year, max_year, sold_in_us=True):
+        return [trim for trim in CATALOG if min_year <= trim.model_year <= max_year]
+
+    monkeypatch.setattr(planner.carquery, "get_trims_for_make", get_trims_for_make)
+    # 2023 alone returns two trims, so it may be truncated.
+    monkeypatch.setattr(planner, "CARQUERY_RESULT_LIMIT", 2)
+    source_planner = planner.SourcePlanner(None, AliasMemory(), min_year=2022, max_year=2024)
+
+    assert await source_planner.make_year("Toyota", ["toyota"], 2024) is None
+    assert await source_planner.make_year("Toyota", ["toyota"], 2022) is None
+
+
+@pytest.mark.asyncio
+async def test_planner_aclose_cancels_orphaned_fetches(monkeypatch):
+    started = asyncio.Event()
+
+    async def get_trims_for_make(client, make, *, min_year, max_year, sold_in_us=True):
+        started.set()
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(planner.carquery, "get_trims_for_make", get_trims_for_make)
+    source_planner = planner.SourcePlanner(None, AliasMemory(), min_year=2024, max_year=2024)
+    caller = asyncio.ensure_future(source_planner.make_year("Toyota", ["toyota"], 2024))
+    await started.wait()
+    caller.cancel()
+
+    await source_planner.aclose()
+    assert all(task.cancelled() for task in source_planner.tasks.values())
@@ -0,0 +1,26 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from etl.profiling import SyncProfiler
+
+
+@pytest.mark.asyncio
+async def test_year_profile_separates_blocking_from_awaiting(tmp_path):
+    profiler = SyncProfiler(tmp_path)
+
+    async with profiler.year(2024):
+        await asyncio.sleep(0.2)
+        deadline = time.perf_counter() + 0.15
+        while time.perf_counter() < deadline:  # blocks the loop
+            pass
+
+    assert (tmp_path / "year_2024.prof").exists()
+    assert "top 40 by cumulative" in (tmp_path / "year_2024.txt").read_text()
+    row = json.loads(profiler.write_summary().read_text())["years"][0]
+    assert row["busy_seconds"] >= 0.1
+    assert row["await_seconds"] >= 0.15
+    assert row["loop_lag_max_seconds"] >= 0.1
+    assert row["loop_stalls"] == 1